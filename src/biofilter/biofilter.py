@@ -1,19 +1,156 @@
 #!/usr/bin/env python
 
+import apsw
 import argparse
 import codecs
 import collections
 import csv
+import functools
 import itertools
+import operator
 import os
 import random
-import string
 import sys
 import time
 
 from loki import loki_db
 
 
+def _generateNearestGeneColumnSources():
+	"""
+	Generates the upstream_* and downstream_* column sources for Biofilter._queryColumnSources.
+
+	Every one of these columns is the same correlated subquery against the
+	nearest gene boundary, differing only by direction, projected column and
+	the outer position alias; rather than spelling out each variant, they are
+	expanded once from a single template per direction.
+
+	Returns:
+		(dict): { col : list[ tuple(alias,rowid,expression),... ], ... }
+	"""
+	# {a} is the outer position alias; doubled braces survive as buildQuery() option placeholders
+	region = "FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {{typeID_gene}} AND d_br.ldprofile_id = {{ldprofileID}} AND d_br.chr = {a}.chr"
+	streams = {
+		# direction : (boundary column, boundary subquery, distance expression)
+		'upstream'   : ('posMax', "(SELECT MAX(d_br.posMax) " + region + " AND d_br.posMax < {a}.pos - {{rpMargin}})", "{a}.pos - {bound}"),
+		'downstream' : ('posMin', "(SELECT MIN(d_br.posMin) " + region + " AND d_br.posMin > {a}.pos + {{rpMargin}})", "-{a}.pos + {bound}"),
+	}
+	projections = (
+		('id',    "d_b.biopolymer_id"),
+		('label', "d_b.label"),
+		('start', "d_br.posMin {{pMinOffset}}"),
+		('stop',  "d_br.posMax {{pMaxOffset}}"),
+	)
+	aliases = (('a_l','rowid'), ('m_l','rowid'), ('d_sl','_ROWID_'))
+
+	ret = dict()
+	for stream,info in streams.items():
+		boundCol,bound,distance = info
+		# nearest genes are located by an equality match against the boundary, which
+		# the (ldprofile_id,chr,posMax/posMin) indexes can satisfy directly, rather than
+		# ORDER BY ... LIMIT 1 which leaves the sort strategy up to the planner
+		nearest = "(SELECT {proj} " + region + " AND d_br." + boundCol + " = " + bound + " LIMIT 1)"
+		for name,proj in projections:
+			tmpl = nearest.replace("{proj}", proj)
+			ret[stream+'_'+name] = [ (a, rowid, tmpl.format(a=a)) for a,rowid in aliases ]
+		tmpl = distance.format(a='{a}', bound=bound)
+		ret[stream+'_distance'] = [ (a, rowid, tmpl.format(a=a)) for a,rowid in aliases ]
+	return ret
+#_generateNearestGeneColumnSources()
+
+
+# define a CSV dialect for conf files (to support "quoted substrings"),
+# registered once at import so readers can refer to it by name
+class cfDialect(csv.Dialect):
+	delimiter = ' '
+	doublequote = False
+	escapechar = '\\'
+	lineterminator = '\n'
+	quotechar = '"'
+	quoting = csv.QUOTE_MINIMAL
+	skipinitialspace = True
+#cfDialect
+csv.register_dialect('biofilter_cf', cfDialect)
+
+
+def _configFileLines(cfHandle):
+	"""
+	Yields the meaningful lines of a configuration file, with tabs
+	treated as spaces and blank or comment lines skipped.
+
+	Parameters:
+		cfHandle (iterable): the open file (or buffered lines) to read
+
+	Returns:
+		(generator): stripped line strings
+	"""
+	for line in cfHandle:
+		line = line.replace('\t',' ').strip()
+		if line and not line.startswith('#'):
+			yield line
+#_configFileLines()
+
+
+@functools.lru_cache(maxsize=None)
+def _configOptionLabel(opt):
+	"""
+	Formats an option name as a padded configuration file keyword,
+	remembering the result since the same keywords recur across rows.
+
+	Parameters:
+		opt (str): the option name, i.e. 'verify_source_file'
+
+	Returns:
+		(str): the padded keyword, i.e. 'VERIFY_SOURCE_FILE                 '
+	"""
+	return "%-35s" % opt.upper().replace('-','_')
+#_configOptionLabel()
+
+
+class _LazyFile:
+	"""
+	An output file which is not actually opened until it is first written,
+	so that a run which fails early does not hold open (or truncate) every
+	output file it had planned to write.
+	"""
+	__slots__ = ('path','mode','_file')
+	
+	# rows arrive a chunk at a time through writelines(), which still copies them into the
+	# buffer line by line; a 1 MiB buffer gives the OS far fewer writes than the default 8 KiB
+	_bufferSize = 1 << 20
+	
+	def __init__(self, path, mode='wb'):
+		"""
+		Args:
+			path (str): The path of the output file.
+			mode (str): The mode in which to open it on first write.
+		"""
+		self.path = path
+		self.mode = mode
+		self._file = None
+	#__init__()
+	
+	def _open(self):
+		if self._file == None:
+			self._file = open(self.path, self.mode, self._bufferSize)
+		return self._file
+	#_open()
+	
+	def write(self, data):
+		return self._open().write(data)
+	#write()
+	
+	def writelines(self, lines):
+		self._open().writelines(lines)
+	#writelines()
+	
+	def close(self):
+		# an output which was never written is still created (empty), as it would have been before
+		self._open().close()
+	#close()
+#_LazyFile
+
+
 class Biofilter:
 	"""
 	Biofilter class for managing biological data filtering.
@@ -347,7 +484,26 @@ class Biofilter:
 		self._inputFilters  = {db:{tbl:0 for tbl in self._schema[db]} for db in self._schema}
 		self._geneModels = None
 		self._onlyGeneModels = True #TODO
-		
+		self._ldprofileID = None
+		self._sourceFingerprints = None
+		self._queryPairConditionCache = dict() # { (conds,aliasL,aliasR,options) : frozenset(formatted conds) }
+		self._queryPlanCache = dict() # { sql : plan text }
+
+		# assign each table alias a bit, and pair each column source with its alias bit,
+		# so that buildQuery() can test source availability with a single AND
+		self._queryAliasBit = { alias:(1 << n) for n,alias in enumerate(sorted(self._queryAliasTable)) }
+		self._queryColumnSourceBits = { col:tuple((self._queryAliasBit[source[0]], source) for source in sources) for col,sources in self._queryColumnSources.items() }
+		
+		# the full table alias join graph is static, so build it once and let
+		# buildQuery() just prune the nodes that fail its filters
+		self._queryAliasGraph = collections.defaultdict(set)
+		for aliasPairs in self._queryAliasJoinConditions:
+			for aliasLeft in aliasPairs[0]:
+				for aliasRight in aliasPairs[-1]:
+					if aliasLeft != aliasRight:
+						self._queryAliasGraph[aliasLeft].add(aliasRight)
+						self._queryAliasGraph[aliasRight].add(aliasLeft)
+
 		# verify loki_db version 
 		minLoki = (2,2,1,'a',2) # 'extra' input support in generateLiftOver*()
 		if loki_db.Database.getVersionTuple() < minLoki:
@@ -360,6 +516,8 @@ class Biofilter:
 			if db != 'main': # in SQLite 'main' is implicit, but the others must be attached as temp stores
 				self._loki.attachTempDatabase(db)
 			self._loki.createDatabaseTables(self._schema[db], db, None, doIndecies=True)
+		# candidate identification rewrites whole tables, so let the scratch store keep them all in memory
+		self._loki._db.cursor().execute("PRAGMA `cand`.cache_size = -262144")
 	#__init__()
 	
 	
@@ -515,6 +673,8 @@ class Biofilter:
 		Returns:
 			(NA): None
 		"""				
+		self._ldprofileID = None
+		self._sourceFingerprints = None
 		return self._loki.attachDatabaseFile(dbFile)
 	#attachDatabaseFile()
 	
@@ -533,7 +693,7 @@ class Biofilter:
 		assert((db in self._schema) and (table in self._schema[db]))
 		if table not in self._tablesDeindexed[db]:
 			self._tablesDeindexed[db].add(table)
-			self._loki.dropDatabaseIndecies(self._schema[db], db, table)
+			self._loki.dropDatabaseIndices(self._schema[db], db, table)
 	#prepareTableForUpdate()
 	
 	
@@ -551,7 +711,7 @@ class Biofilter:
 		assert((db in self._schema) and (table in self._schema[db]))
 		if table in self._tablesDeindexed[db]:
 			self._tablesDeindexed[db].remove(table)
-			self._loki.createDatabaseIndecies(self._schema[db], db, table)
+			self._loki.createDatabaseIndices(self._schema[db], db, table)
 			if table == "region":
 				self.updateRegionZones(db)
 	#prepareTableForQuery()
@@ -638,20 +798,19 @@ class Biofilter:
 	
 	def getSourceFingerprints(self):
 		"""
-		Retrieves source fingerprints.
+		Retrieves source fingerprints, which are cached until another knowledge database is attached.
 
 		Returns:
 			(OrderedDict): Source fingerprints.
 		"""			
-		ret = collections.OrderedDict()
-		sourceIDs = self._loki.getSourceIDs()
-		for source in sorted(sourceIDs):
-			ret[source] = (
-					self._loki.getSourceIDVersion(sourceIDs[source]),
-					self._loki.getSourceIDOptions(sourceIDs[source]),
-					self._loki.getSourceIDFiles(sourceIDs[source])
-			)
-		return ret
+		if self._sourceFingerprints == None:
+			ret = collections.OrderedDict()
+			sourceIDs = self._loki.getSourceIDs()
+			fingerprints = self._loki.getSourceIDFingerprints(sourceIDs.values())
+			for source in sorted(sourceIDs):
+				ret[source] = fingerprints[sourceIDs[source]]
+			self._sourceFingerprints = ret
+		return self._sourceFingerprints
 	#getSourceFingerprints()
 	
 	
@@ -761,6 +920,24 @@ class Biofilter:
 	#getOptionNamespaceID()
 	
 	
+	def getOptionLDProfileID(self):
+		"""
+		Retrieves the LD profile ID for the configured --ld-profile, resolving it only once per knowledge database.
+
+		Returns:
+			(int): The LD profile ID.
+
+		Raises:
+			SystemExit: If the LD profile is not found in the database.
+		"""		
+		if self._ldprofileID == None:
+			self._ldprofileID = self._loki.getLDProfileID(self._options.ld_profile or '')
+			if not self._ldprofileID:
+				sys.exit("ERROR: %s LD profile record not found in the knowledge database" % (self._options.ld_profile or '<default>',))
+		return self._ldprofileID
+	#getOptionLDProfileID()
+	
+	
 	##################################################
 	# input data parsers and lookup helpers
 	
@@ -2068,7 +2245,7 @@ JOIN `db`.`biopolymer` AS d_b
 					sig = False
 				
 				matched = False
-				for f in chrZoneFeatures[chm][pos / zoneSize]:
+				for f in chrZoneFeatures[chm][int(pos / zoneSize)]:
 					fid,fchm,fposMin,fposMax = featureBounds[f]
 					if (chm == fchm) and (pos >= fposMin) and (pos <= fposMax):
 						matched = True
@@ -2162,7 +2339,7 @@ JOIN `db`.`biopolymer` AS d_b
 				binFeatures[b].append(fid)
 		# distribute all remaining features into bins of equal size, close to the target size
 		count = max(1, int(0.5 + float(len(listFeatures)) / self._options.paris_bin_size))
-		size = len(listFeatures) / count
+		size = len(listFeatures) // count
 		extra = len(listFeatures) - (count * size)
 		for b in range(2,2+count):
 			for n in range(size + (1 if ((b-2) < extra) else 0)):
@@ -2187,7 +2364,7 @@ JOIN `db`.`biopolymer` AS d_b
 		# cull empty feature regions from the db, to speed up region matching later
 		self.logPush("culling empty feature regions ...\n")
 		sql = "DELETE FROM `main`.`region` WHERE rowid = ?"
-		cursor.executemany(sql, itertools.izip(binFeatures[0]))
+		cursor.executemany(sql, zip(binFeatures[0]))
 		self.logPop("... OK\n")
 		
 		self.logPush("mapping pathway genes ...\n")
@@ -2341,6 +2518,10 @@ JOIN `db`.`biopolymer` AS d_b
 		'd_w'    : ('db','gwas'),               # (rs,chr,pos)
 	} #class._queryAliasTable{}
 	
+	# pre-render each alias's FROM and LEFT JOIN clause text for getQueryText()
+	_queryAliasFromText = { alias:("`%s`.`%s` AS %s" % (dbtable + (alias,))) for alias,dbtable in _queryAliasTable.items() }
+	_queryAliasLeftJoinText = { alias:("LEFT JOIN `%s`.`%s` AS %s\n" % (dbtable + (alias,))) for alias,dbtable in _queryAliasTable.items() }
+	
 	
 	# define constraints on single table aliases: dict{ set(a1,a2,...) : set(cond1,cond2,...), ... }
 	_queryAliasConditions = {
@@ -2690,58 +2871,6 @@ JOIN `db`.`biopolymer` AS d_b
 			('d_b',  'biopolymer_id', "NULL", {"d_b.type_id+0 = {typeID_gene}"}),
 		],
 		
-		'upstream_id' : [
-			('a_l',  'rowid',   "(SELECT d_b.biopolymer_id         FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMax < a_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_b.biopolymer_id         FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMax < m_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_b.biopolymer_id         FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMax < d_sl.pos - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-		],
-		'upstream_label' : [
-			('a_l',  'rowid',   "(SELECT d_b.label                 FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMax < a_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_b.label                 FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMax < m_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_b.label                 FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMax < d_sl.pos - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-		],
-		'upstream_distance' : [
-			('a_l',  'rowid',   "a_l.pos -(SELECT MAX(d_br.posMax) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMax < a_l.pos  - {rpMargin})"),
-			('m_l',  'rowid',   "m_l.pos -(SELECT MAX(d_br.posMax) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMax < m_l.pos  - {rpMargin})"),
-			('d_sl', '_ROWID_', "d_sl.pos-(SELECT MAX(d_br.posMax) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMax < d_sl.pos - {rpMargin})"),
-		],
-		'upstream_start' : [
-			('a_l',  'rowid',   "(SELECT d_br.posMin {pMinOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMax < a_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_br.posMin {pMinOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMax < m_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_br.posMin {pMinOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMax < d_sl.pos - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-		],
-		'upstream_stop' : [
-			('a_l',  'rowid',   "(SELECT d_br.posMax {pMaxOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMax < a_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_br.posMax {pMaxOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMax < m_l.pos  - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_br.posMax {pMaxOffset}  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMax < d_sl.pos - {rpMargin} ORDER BY d_br.posMax DESC LIMIT 1)"),
-		],
-		
-		'downstream_id' : [
-			('a_l',  'rowid',   "(SELECT d_b.biopolymer_id          FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMin > a_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_b.biopolymer_id          FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMin > m_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_b.biopolymer_id          FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMin > d_sl.pos + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-		],
-		'downstream_label' : [
-			('a_l',  'rowid',   "(SELECT d_b.label                  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMin > a_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_b.label                  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMin > m_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_b.label                  FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMin > d_sl.pos + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-		],
-		'downstream_distance' : [
-			('a_l',  'rowid',   "-a_l.pos +(SELECT MIN(d_br.posMin) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMin > a_l.pos  + {rpMargin})"),
-			('m_l',  'rowid',   "-m_l.pos +(SELECT MIN(d_br.posMin) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMin > m_l.pos  + {rpMargin})"),
-			('d_sl', '_ROWID_', "-d_sl.pos+(SELECT MIN(d_br.posMin) FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMin > d_sl.pos + {rpMargin})"),
-		],
-		'downstream_start' : [
-			('a_l',  'rowid',   "(SELECT d_br.posMin {pMinOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMin > a_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_br.posMin {pMinOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMin > m_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_br.posMin {pMinOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMin > d_sl.pos + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-		],
-		'downstream_stop' : [
-			('a_l',  'rowid',   "(SELECT d_br.posMax {pMaxOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = a_l.chr  AND d_br.posMin > a_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('m_l',  'rowid',   "(SELECT d_br.posMax {pMaxOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = m_l.chr  AND d_br.posMin > m_l.pos  + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-			('d_sl', '_ROWID_', "(SELECT d_br.posMax {pMaxOffset}   FROM `db`.`biopolymer` AS d_b JOIN `db`.`biopolymer_region` AS d_br USING (biopolymer_id) WHERE d_b.type_id+0 = {typeID_gene} AND d_br.ldprofile_id = {ldprofileID} AND d_br.chr = d_sl.chr AND d_br.posMin > d_sl.pos + {rpMargin} ORDER BY d_br.posMin LIMIT 1)"),
-		],
-		
 		'group_id' : [
 			('a_g',    'group_id', "a_g.group_id"),
 			('m_g',    'group_id', "m_g.group_id"),
@@ -2837,6 +2966,7 @@ JOIN `db`.`biopolymer` AS d_b
 			('d_g', 'group_id', "(SELECT subtype FROM `db`.`subtype` AS d_s JOIN `db`.`group` AS dg USING (subtype_id) JOIN `db`.`type` AS d_t USING (type_id) WHERE dg.group_id = d_g.group_id AND d_t.type = 'disease')"),
 		]
 	} #class._queryColumnSources
+	_queryColumnSources.update(_generateNearestGeneColumnSources())
 	
 	
 	def getQueryTemplate(self):
@@ -2906,30 +3036,19 @@ JOIN `db`.`biopolymer` AS d_b
 					knowFilter['user'][tbl] = True
 		query = self.getQueryTemplate()
 		empty = dict()
+		emptySet = frozenset()
 		
 		# generate table alias join adjacency map
 		# (usually this is the entire table join graph, minus nodes that
 		# represent empty user input tables, since joining through them would
 		# yield zero results by default)
-		aliasAdjacent = collections.defaultdict(set)
-		for aliasPairs in self._queryAliasJoinConditions:
-			for aliasLeft in aliasPairs[0]:
-				for aliasRight in aliasPairs[-1]:
-					if aliasLeft != aliasRight:
-						dbLeft,tblLeft = self._queryAliasTable[aliasLeft]
-						dbRight,tblRight = self._queryAliasTable[aliasRight]
-						tblLeft = 'region' if (tblLeft == 'region_zone') else tblLeft
-						tblRight = 'region' if (tblRight == 'region_zone') else tblRight
-						if knowFilter.get(dbLeft,empty).get(tblLeft) or joinFilter.get(dbLeft,empty).get(tblLeft):
-							if knowFilter.get(dbRight,empty).get(tblRight) or joinFilter.get(dbRight,empty).get(tblRight):
-								aliasAdjacent[aliasLeft].add(aliasRight)
-								aliasAdjacent[aliasRight].add(aliasLeft)
-							#if aliasRight passes knowledge or join filter
-						#if aliasLeft passes knowledge or join filter
-					#if aliases differ
-				#foreach aliasRight
-			#foreach aliasLeft
-		#foreach _queryAliasJoinConditions
+		aliasPassed = set()
+		for alias,dbtable in self._queryAliasTable.items():
+			db,tbl = dbtable
+			tbl = 'region' if (tbl == 'region_zone') else tbl
+			if knowFilter.get(db,empty).get(tbl) or joinFilter.get(db,empty).get(tbl):
+				aliasPassed.add(alias)
+		aliasAdjacent = { alias:(adjacent & aliasPassed) for alias,adjacent in self._queryAliasGraph.items() if (alias in aliasPassed) and not adjacent.isdisjoint(aliasPassed) }
 		
 		# debug
 		if self._options.debug_logic:
@@ -2939,17 +3058,19 @@ JOIN `db`.`biopolymer` AS d_b
 		
 		# generate column availability map
 		# _queryColumnSources[col] = list[ tuple(alias,rowid,expression,?conditions),... ]
-		columnAliases = collections.defaultdict(list)
-		aliasColumns = collections.defaultdict(set)
 		for col in itertools.chain(select,having):
 			if col not in self._queryColumnSources:
 				raise Exception("internal query with unsupported column '{0}'".format(col))
-			if col not in columnAliases:
-				for source in self._queryColumnSources[col]:
-					if source[0] in aliasAdjacent:
-						columnAliases[col].append(source[0])
-						aliasColumns[source[0]].add(col)
-		if not (columnAliases and aliasColumns):
+		columnAliases = { col:[ source[0] for source in self._queryColumnSources[col] if (source[0] in aliasAdjacent) ] for col in itertools.chain(select,having) }
+		columnAliases = { col:aliases for col,aliases in columnAliases.items() if aliases }
+		aliasColumns = dict()
+		for col,aliases in columnAliases.items():
+			for alias in aliases:
+				if alias in aliasColumns:
+					aliasColumns[alias].add(col)
+				else:
+					aliasColumns[alias] = {col}
+		if not aliasColumns:
 			raise Exception("internal query with no outputs or conditions")
 		
 		# debug
@@ -3001,8 +3122,19 @@ JOIN `db`.`biopolymer` AS d_b
 		if self._options.debug_logic:
 			self.warn("starting FROM = %s\n" % ', '.join(query['FROM']))
 		
-		# add any table aliases necessary to join the currently included tables
+		# check whether the currently included tables already join to each other directly;
+		# if so, the BFS below could only rediscover the same set, so it can be skipped
+		joined = set()
 		if len(query['FROM']) > 1:
+			pending = [next(iter(query['FROM']))]
+			while pending:
+				alias = pending.pop()
+				if alias not in joined:
+					joined.add(alias)
+					pending.extend(aliasAdjacent.get(alias, emptySet) & query['FROM'])
+		
+		# add any table aliases necessary to join the currently included tables
+		if (len(query['FROM']) > 1) and (joined != query['FROM']):
 			remaining = query['FROM'].copy()
 			inside = {remaining.pop()}
 			outside = set(aliasAdjacent) - inside
@@ -3052,31 +3184,45 @@ JOIN `db`.`biopolymer` AS d_b
 					raise Exception("could not join source table %s for output column %s" % (alias,target))
 				while path:
 					alias = path.pop()
-					columnsRemaining.difference_update(aliasColumns[alias])
+					columnsRemaining.difference_update(aliasColumns.get(alias, emptySet))
 					query['LEFT JOIN'][alias] = set()
 				if self._options.debug_logic:
 					self.warn("new LEFT JOIN = %s\n" % ', '.join(query['LEFT JOIN']))
 			#while columns need sources
 		else:
-			# when filtering, build a minimum spanning tree to connect all remaining columns in any order
-			#TODO: choose preferred source first as in annotation, rather than blindly expanding until we hit them all?
+			# when filtering, grow a (greedy) Steiner tree: for each remaining column in order,
+			# add the shortest path from the current tables to its nearest available source,
+			# preferring the earliest-listed source among those at the same distance
 			if columnsRemaining:
-				remaining = columnsRemaining
-				inside = query['FROM']
-				outside = set( a for a,t in self._queryAliasTable.items() if ((a not in inside) and (a not in query['LEFT JOIN']) and (knowFilter.get(t[0],empty).get(t[1]) or t[1] == 'region_zone')) )
+				outside = set( a for a,t in self._queryAliasTable.items() if ((a not in query['FROM']) and (a not in query['LEFT JOIN']) and (knowFilter.get(t[0],empty).get(t[1]) or t[1] == 'region_zone')) )
 				if self._options.debug_logic:
 					self.warn("remaining columns = %s\n" % ', '.join(columnsRemaining))
 					self.warn("available aliases = %s\n" % ', '.join(outside))
-				queue = collections.deque()
-				queue.append( (inside,outside,remaining) )
-				while queue:
-					inside,outside,remaining = queue.popleft()
-					if not remaining:
-						break
-					queue.extend((inside|{a},outside-{a},remaining-aliasColumns[a]) for a in outside if inside & aliasAdjacent[a])
-				if remaining:
-					raise Exception("could not find a source table for output columns: %s" % ', '.join(columnsRemaining))
-				query['FROM'] |= inside
+				for target in itertools.chain(select,having):
+					if target not in columnsRemaining:
+						continue
+					parent = dict()
+					frontier = sorted(query['FROM'])
+					alias = None
+					while frontier and not alias:
+						nextFrontier = list()
+						for a in frontier:
+							for b in sorted(aliasAdjacent.get(a, emptySet) & outside):
+								if b not in parent:
+									parent[b] = a
+									nextFrontier.append(b)
+						alias = next((a for a in columnAliases[target] if a in parent), None)
+						frontier = nextFrontier
+					if not alias:
+						raise Exception("could not find a source table for output columns: %s" % ', '.join(columnsRemaining))
+					while alias not in query['FROM']:
+						query['FROM'].add(alias)
+						outside.discard(alias)
+						columnsRemaining.difference_update(aliasColumns.get(alias, emptySet))
+						alias = parent[alias]
+					if self._options.debug_logic:
+						self.warn("target column = %s, new FROM = %s\n" % (target,', '.join(query['FROM'])))
+				#foreach remaining column
 			#if columns need sources
 		#if annotate
 		
@@ -3086,7 +3232,6 @@ JOIN `db`.`biopolymer` AS d_b
 			self.warn("final LEFT JOIN = %s\n" % ', '.join(query['LEFT JOIN']))
 		
 		# fetch option values to insert into condition strings
-		formatter = string.Formatter()
 		options = {
 			'L'           : None,
 			'R'           : None,
@@ -3102,10 +3247,8 @@ JOIN `db`.`biopolymer` AS d_b
 			'gbColumn2'   : 'specificity',
 			'gbCondition' : ('> 0' if (self._options.allow_ambiguous_knowledge == 'yes') else '>= 100'),
 			'zoneSize'    : int(self._loki.getDatabaseSetting('zone_size') or 0),
-			'ldprofileID' : self._loki.getLDProfileID(self._options.ld_profile or ''),
+			'ldprofileID' : self.getOptionLDProfileID(),
 		}
-		if not options['ldprofileID']:
-			sys.exit("ERROR: %s LD profile record not found in the knowledge database" % (self._options.ld_profile or '<default>',))
 		if applyOffset:
 			if (self._options.coordinate_base != 1):
 				options['pMinOffset'] = '+ %d' % (self._options.coordinate_base - 1,)
@@ -3119,19 +3262,24 @@ JOIN `db`.`biopolymer` AS d_b
 		if self._options.debug_logic:
 			self.warn("initial WHERE = %s\n" % query['WHERE'])
 		
+		# collect the available table aliases as a bitmask for column source lookups
+		availableBits = 0
+		for alias in itertools.chain(query['FROM'], query['LEFT JOIN']):
+			availableBits |= self._queryAliasBit[alias]
+		
 		# assign 'select' output columns
 		for col in select:
 			if query['SELECT'][col] != None:
 				continue
 			# _queryColumnSources[col] = list[ tuple(alias,rowid,expression,?conditions),... ]
-			for colsrc in self._queryColumnSources[col]:
-				if (colsrc[0] in query['FROM']) or (colsrc[0] in query['LEFT JOIN']):
+			for bit,colsrc in self._queryColumnSourceBits[col]:
+				if bit & availableBits:
 					if colsrc[0] not in query['_rowid']:
 						query['_rowid'][colsrc[0]] = set()
 					query['_rowid'][colsrc[0]].add(colsrc[1])
-					query['SELECT'][col] = formatter.vformat(colsrc[2], args=None, kwargs=options)
+					query['SELECT'][col] = colsrc[2].format_map(options)
 					if (len(colsrc) > 3) and colsrc[3]:
-						srcconds = (formatter.vformat(c, args=None, kwargs=options) for c in colsrc[3])
+						srcconds = (c.format_map(options) for c in colsrc[3])
 						if colsrc[0] in query['FROM']:
 							query['WHERE'].update(srcconds)
 						elif colsrc[0] in query['LEFT JOIN']:
@@ -3149,16 +3297,16 @@ JOIN `db`.`biopolymer` AS d_b
 		# assign 'having' column conditions
 		for col,conds in having.items():
 			# _queryColumnSources[col] = list[ tuple(alias,rowid,expression,?conditions),... ]
-			for colsrc in self._queryColumnSources[col]:
-				if (colsrc[0] in query['FROM']) or (colsrc[0] in query['LEFT JOIN']):
-					colconds = ("({0} {1})".format(formatter.vformat(colsrc[2], args=None, kwargs=options), c) for c in conds)
+			for bit,colsrc in self._queryColumnSourceBits[col]:
+				if bit & availableBits:
+					colconds = ("({0} {1})".format(colsrc[2].format_map(options), c) for c in conds)
 					if colsrc[0] in query['FROM']:
 						query['WHERE'].update(colconds)
 					elif colsrc[0] in query['LEFT JOIN']:
 						query['LEFT JOIN'][colsrc[0]].update(colconds)
 					
 					if (len(colsrc) > 3) and colsrc[3]:
-						srcconds = (formatter.vformat(c, args=None, kwargs=options) for c in colsrc[3])
+						srcconds = (c.format_map(options) for c in colsrc[3])
 						if colsrc[0] in query['FROM']:
 							query['WHERE'].update(srcconds)
 						elif colsrc[0] in query['LEFT JOIN']:
@@ -3174,7 +3322,7 @@ JOIN `db`.`biopolymer` AS d_b
 		
 		# add 'where' column conditions
 		for tblcol,conds in where.items():
-			query['WHERE'].update("{0}.{1} {2}".format(tblcol[0], tblcol[1], formatter.vformat(c, args=None, kwargs=options)) for c in conds)
+			query['WHERE'].update("{0}.{1} {2}".format(tblcol[0], tblcol[1], c.format_map(options)) for c in conds)
 		
 		# debug
 		if self._options.debug_logic:
@@ -3184,10 +3332,10 @@ JOIN `db`.`biopolymer` AS d_b
 		for aliases,conds in self._queryAliasConditions.items():
 			for alias in aliases.intersection(query['FROM']):
 				options['L'] = alias
-				query['WHERE'].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
+				query['WHERE'].update(c.format_map(options) for c in conds)
 			for alias in aliases.intersection(query['LEFT JOIN']):
 				options['L'] = alias
-				query['LEFT JOIN'][alias].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
+				query['LEFT JOIN'][alias].update(c.format_map(options) for c in conds)
 		
 		# TODO: find a way to move this back into _queryAliasConditions without the covering index problem
 		if self._options.allow_unvalidated_snp_positions != 'yes':
@@ -3200,27 +3348,38 @@ JOIN `db`.`biopolymer` AS d_b
 		if self._options.debug_logic:
 			self.warn("table WHERE = %s\n" % query['WHERE'])
 		
-		# add join and pair constraints for included table alias pairs
+		# formatted pair constraints depend only on the aliases and the options,
+		# so they can be reused by every query built with the same options
+		optionsKey = tuple(sorted((k,v) for k,v in options.items() if k not in ('L','R')))
+		def formatPairConditions(conds, aliasLeft, aliasRight):
+			key = (conds, aliasLeft, aliasRight, optionsKey)
+			if key not in self._queryPairConditionCache:
+				options['L'] = aliasLeft
+				options['R'] = aliasRight
+				self._queryPairConditionCache[key] = frozenset(c.format_map(options) for c in conds)
+			return self._queryPairConditionCache[key]
+		#formatPairConditions()
+		
+		# add join and pair constraints for included table alias pairs; each
+		# included alias gets a position (-1 for FROM, otherwise its LEFT JOIN
+		# order) so that a pair's constraints belong in the WHERE clause if both
+		# are -1, or else in the ON clause of whichever alias is joined later
+		queryLeftJoin = query['LEFT JOIN']
+		aliasPosition = {alias:n for n,alias in enumerate(queryLeftJoin)}
+		aliasPosition.update((alias,-1) for alias in query['FROM'])
 		for aliasPairs,conds in itertools.chain(self._queryAliasJoinConditions.items(), self._queryAliasPairConditions.items()):
 			for aliasLeft in aliasPairs[0]:
+				positionLeft = aliasPosition.get(aliasLeft)
+				if positionLeft == None:
+					continue
 				for aliasRight in aliasPairs[-1]:
-					options['L'] = aliasLeft
-					options['R'] = aliasRight
-					if aliasLeft == aliasRight:
-						pass
-					elif (aliasLeft in query['FROM']) and (aliasRight in query['FROM']):
-						query['WHERE'].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
-					elif (aliasLeft in query['FROM']) and (aliasRight in query['LEFT JOIN']):
-						query['LEFT JOIN'][aliasRight].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
-					elif (aliasLeft in query['LEFT JOIN']) and (aliasRight in query['FROM']):
-						query['LEFT JOIN'][aliasLeft].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
-					elif (aliasLeft in query['LEFT JOIN']) and (aliasRight in query['LEFT JOIN']):
-						indexLeft = list(query['LEFT JOIN'].keys()).index(aliasLeft)
-						indexRight = list(query['LEFT JOIN'].keys()).index(aliasRight)
-						if indexLeft > indexRight:
-							query['LEFT JOIN'][aliasLeft].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
-						else:
-							query['LEFT JOIN'][aliasRight].update(formatter.vformat(c, args=None, kwargs=options) for c in conds)
+					positionRight = aliasPosition.get(aliasRight)
+					if (positionRight == None) or (aliasLeft == aliasRight):
+						continue
+					if positionLeft == positionRight:
+						query['WHERE'].update(formatPairConditions(conds, aliasLeft, aliasRight))
+					else:
+						queryLeftJoin[aliasLeft if (positionLeft > positionRight) else aliasRight].update(formatPairConditions(conds, aliasLeft, aliasRight))
 				#foreach right alias
 			#foreach left alias
 		#foreach pair constraint
@@ -3243,36 +3402,106 @@ JOIN `db`.`biopolymer` AS d_b
 		Returns:
 			(str): The SQL text generated from the query.
 		"""		
-		sql = "SELECT " + (",\n  ".join("{0} AS {1}".format(query['SELECT'][col] or "NULL",col) for col in query['_columns'])) + "\n"
-		rowIDs = list()
+		return self._getQueryTextCached(self._freezeQuery(query), bool(noRowIDs), bool(sortRowIDs), bool(splitRowIDs))
+	#getQueryText()
+	
+	
+	@staticmethod
+	def _freezeQuery(query):
+		"""
+		Converts a query dictionary into a hashable equivalent suitable for use as a cache key.
+		
+		Parameters:
+			query (dict): A dictionary representing the query.
+		
+		Returns:
+			(tuple): A tuple of (clause, value) pairs, with dicts frozen to tuples of items and sets and lists to tuples.
+		"""
+		# the FROM, WHERE, HAVING and LEFT JOIN condition sets are rendered in
+		# sorted order anyway, so sort them once here; other sets keep their
+		# iteration order, since callers may rely on the rowid columns being
+		# rendered in the same order they iterate them
+		def freeze(value):
+			if isinstance(value, dict):
+				return tuple((k,freeze(v)) for k,v in value.items())
+			if isinstance(value, (set,frozenset,list)):
+				return tuple(value)
+			return value
+		#freeze()
+		frozen = dict()
+		for clause,value in query.items():
+			if clause in ('FROM','WHERE','HAVING'):
+				frozen[clause] = tuple(sorted(value))
+			elif clause == 'LEFT JOIN':
+				frozen[clause] = tuple((alias,tuple(sorted(joinon))) for alias,joinon in value.items())
+			else:
+				frozen[clause] = freeze(value)
+		return tuple((clause,frozen[clause]) for clause in sorted(frozen))
+	#_freezeQuery()
+	
+	
+	@classmethod
+	@functools.lru_cache(maxsize=512)
+	def _getQueryTextCached(cls, frozenQuery, noRowIDs, sortRowIDs, splitRowIDs):
+		"""
+		Generates SQL text from a frozen query, whose condition clauses are already sorted; see getQueryText().
+		
+		Parameters:
+			frozenQuery (tuple): A query as returned by _freezeQuery().
+			noRowIDs (bool): Whether to exclude row IDs from the query text.
+			sortRowIDs (bool): Whether to sort row IDs in the query text.
+			splitRowIDs (bool): Whether to split row IDs into separate columns in the query text.
+		
+		Returns:
+			(str): The SQL text generated from the query.
+		"""
+		query = dict(frozenQuery)
+		for clause in ('SELECT','_rowid','LEFT JOIN'):
+			query[clause] = collections.OrderedDict(query[clause])
+		
+		select = query['SELECT']
+		sql = "SELECT " + (",\n  ".join([ "%s AS %s" % (select[col] or "NULL",col) for col in query['_columns'] ])) + "\n"
+		rowIDCols = list()
 		orderBy = list(query['ORDER BY'])
 		for alias,cols in query['_rowid'].items():
-			rowIDs.extend("COALESCE({0}.{1},'')".format(alias,col) for col in cols)
+			rowIDCols.extend("{0}.{1}".format(alias,col) for col in cols)
 			if sortRowIDs:
 				orderBy.extend("({0}.{1} IS NULL)".format(alias,col) for col in cols)
+		rowIDs = list("COALESCE({0},'')".format(col) for col in rowIDCols)
 		if splitRowIDs:
 			for n in range(len(rowIDs)):
 				sql += "  , {0} AS _rowid_{1}\n".format(rowIDs[n],n)
 		if not noRowIDs:
-			sql += "  , (" + ("||'_'||".join(rowIDs)) + ") AS _rowid\n"
+			rowID = "(" + ("||'_'||".join(rowIDs)) + ")"
+			# when all of the rowids are small enough, pack them into one integer
+			# (offset by one so that NULL can be zero) instead of concatenating text;
+			# the packed and text forms can never compare equal, so mixing them is safe
+			if len(rowIDCols) > 1:
+				bits = 63 // len(rowIDCols)
+				fits = " AND ".join("({0} IS NULL OR {0} BETWEEN 0 AND {1})".format(col,(1 << bits) - 2) for col in rowIDCols)
+				packed = " | ".join("(IFNULL({0} + 1, 0) << {1})".format(col,bits*n) for n,col in enumerate(reversed(rowIDCols)))
+				rowID = "(CASE WHEN {0} THEN {1} ELSE {2} END)".format(fits, packed, rowID)
+			sql += "  , " + rowID + " AS _rowid\n"
 		if query['FROM']:
-			sql += "FROM " + (",\n  ".join("`{0[0]}`.`{0[1]}` AS {1}".format(self._queryAliasTable[a],a) for a in sorted(query['FROM']))) + "\n"
+			fromText = cls._queryAliasFromText
+			sql += "FROM " + (",\n  ".join([ fromText[a] for a in query['FROM'] ])) + "\n"
+		leftJoinText = cls._queryAliasLeftJoinText
 		for alias,joinon in query['LEFT JOIN'].items():
-			sql += "LEFT JOIN `{0[0]}`.`{0[1]}` AS {1}\n".format(self._queryAliasTable[alias],alias)
+			sql += leftJoinText[alias]
 			if joinon:
-				sql += "  ON " + ("\n  AND ".join(sorted(joinon))) + "\n"
+				sql += "  ON " + ("\n  AND ".join(joinon)) + "\n"
 		if query['WHERE']:
-			sql += "WHERE " + ("\n  AND ".join(sorted(query['WHERE']))) + "\n"
+			sql += "WHERE " + ("\n  AND ".join(query['WHERE'])) + "\n"
 		if query['GROUP BY']:
 			sql += "GROUP BY " + (", ".join(query['GROUP BY'])) + "\n"
 		if query['HAVING']:
-			sql += "HAVING " + ("\n  AND ".join(sorted(query['HAVING']))) + "\n"
+			sql += "HAVING " + ("\n  AND ".join(query['HAVING'])) + "\n"
 		if orderBy:
 			sql += "ORDER BY " + (", ".join(orderBy)) + "\n"
 		if query['LIMIT']:
 			sql += "LIMIT " + str(int(query['LIMIT'])) + "\n"
 		return sql
-	#getQueryText()
+	#_getQueryTextCached()
 	
 	
 	def prepareTablesForQuery(self, query):
@@ -3288,6 +3517,24 @@ JOIN `db`.`biopolymer` AS d_b
 	#prepareTablesForQuery()
 	
 	
+	def getQueryPlanText(self, sql, bindings=None):
+		"""
+		Retrieves SQLite's query plan for the provided SQL text, one plan row per line.
+		
+		Parameters:
+			sql (str): The SQL text to explain.
+			bindings (tuple, optional): Bindings for parameterized queries.
+		
+		Returns:
+			(str): The EXPLAIN QUERY PLAN output.
+		"""
+		if sql not in self._queryPlanCache:
+			cursor = self._loki._db.cursor()
+			self._queryPlanCache[sql] = "".join((str(row)+"\n") for row in cursor.execute("EXPLAIN QUERY PLAN "+sql, bindings))
+		return self._queryPlanCache[sql]
+	#getQueryPlanText()
+	
+	
 	def generateQueryResults(self, query, allowDupes=False, bindings=None, query2=None):
 		"""
 		Generates query results based on the provided query.
@@ -3303,16 +3550,23 @@ JOIN `db`.`biopolymer` AS d_b
 		"""	
 		# execute the query and yield the results
 		cursor = self._loki._db.cursor()
-		sql = self.getQueryText(query)
-		sql2 = self.getQueryText(query2) if query2 else None
+		if query2:
+			# run both queries as one compound statement, tagging each row with the
+			# query it came from; UNION ALL returns all of the first query's rows first
+			sql1 = self.getQueryText(dict(query, _columns=(query['_columns'] + ['_query']), SELECT=collections.OrderedDict(query['SELECT'], _query='1')))
+			sql2 = self.getQueryText(dict(query2, _columns=(query2['_columns'] + ['_query']), SELECT=collections.OrderedDict(query2['SELECT'], _query='2')))
+			sql = "SELECT _query, {0}, _rowid\nFROM (\nSELECT * FROM (\n{1})\nUNION ALL\nSELECT * FROM (\n{2}))\n".format(
+				(", ".join(query['_columns'])),
+				sql1,
+				sql2
+			)
+			first = 1
+		else:
+			sql = self.getQueryText(query)
+			first = 0
 		if self._options.debug_query:
 			self.log(sql+"\n")
-			for row in cursor.execute("EXPLAIN QUERY PLAN "+sql, bindings):
-				self.log(str(row)+"\n")
-			if query2:
-				self.log(sql2+"\n")
-				for row in cursor.execute("EXPLAIN QUERY PLAN "+sql2, bindings):
-					self.log(str(row)+"\n")
+			self.log(self.getQueryPlanText(sql, bindings))
 		else:
 			self.prepareTablesForQuery(query)
 			if query2:
@@ -3320,26 +3574,17 @@ JOIN `db`.`biopolymer` AS d_b
 			if allowDupes:
 				lastID = None
 				for row in cursor.execute(sql, bindings):
-					if row[-1] != lastID:
-						lastID = row[-1]
-						yield row[:-1]
-				if query2:
-					lastID = None
-					for row in cursor.execute(sql2, bindings):
-						if row[-1] != lastID:
-							lastID = row[-1]
-							yield row[:-1]
+					rowID = (row[0],row[-1]) if first else row[-1]
+					if rowID != lastID:
+						lastID = rowID
+						yield row[first:-1]
 			else:
+				# skip repeated rows as they stream in, so each row is output in the order it was first seen
 				rowIDs = set()
 				for row in cursor.execute(sql, bindings):
 					if row[-1] not in rowIDs:
 						rowIDs.add(row[-1])
-						yield row[:-1]
-				if query2:
-					for row in cursor.execute(sql2, bindings):
-						if row[-1] not in rowIDs:
-							rowIDs.add(row[-1])
-							yield row[:-1]
+						yield row[first:-1]
 				del rowIDs
 	#generateQueryResults()
 	
@@ -3348,6 +3593,28 @@ JOIN `db`.`biopolymer` AS d_b
 	# filtering, annotation & modeling
 	
 	
+	# define the header labels and query columns for each output type: {type:((header,...),(column,...)),...}
+	_outputTypeHeaderColumns = {
+		'snp'           : (('snp',), ('snp_label',)),
+		'position'      : (('chr','position','pos'), ('position_chr','position_label','position_pos')), # oddball .map file format
+		'gene'          : (('gene',), ('gene_label',)),
+		'generegion'    : (('chr','gene','start','stop'), ('biopolymer_chr','gene_label','biopolymer_start','biopolymer_stop')),
+		'upstream'      : (('upstream','distance'), ('upstream_label','upstream_distance')),
+		'downstream'    : (('downstream','distance'), ('downstream_label','downstream_distance')),
+		'region'        : (('chr','region','start','stop'), ('region_chr','region_label','region_start','region_stop')),
+		'group'         : (('group',), ('group_label',)),
+		'source'        : (('source',), ('source_label',)),
+		'gwas'          : (('trait','snps','OR/beta','allele95%CI','riskAfreq','pubmed'), ('gwas_trait','gwas_snps','gwas_orbeta','gwas_allele95ci','gwas_riskAfreq','gwas_pubmed')),
+		'snpinput'      : (('user_input',), ('snp_label',)),
+		'positioninput' : (('user_input',), ('position_label',)),
+		'geneinput'     : (('user_input',), ('gene_label',)),
+		'regioninput'   : (('user_input',), ('region_label',)),
+		'groupinput'    : (('user_input',), ('group_label',)),
+		'sourceinput'   : (('user_input',), ('source_label',)),
+		'disease'       : (('disease','disease_category'), ('disease_label','disease_category')),
+	} #class._outputTypeHeaderColumns{}
+	
+	
 	def _populateColumnsFromTypes(self, types, columns=None, header=None, ids=None):
 		"""
 		Populates column and header lists based on the provided types.
@@ -3368,57 +3635,10 @@ JOIN `db`.`biopolymer` AS d_b
 		if ids == None:
 			ids = list()
 		for t in types:
-			if t == 'snp':
-				header.extend(['snp'])
-				columns.extend(['snp_label'])
-			elif t == 'position':
-				header.extend(['chr','position','pos'])
-				columns.extend(['position_chr','position_label','position_pos']) # oddball .map file format
-			elif t == 'gene':
-				header.extend(['gene'])
-				columns.extend(['gene_label'])
-			elif t == 'generegion':
-				header.extend(['chr','gene','start','stop'])
-				columns.extend(['biopolymer_chr','gene_label','biopolymer_start','biopolymer_stop'])
-			elif t == 'upstream':
-				header.extend(['upstream','distance'])
-				columns.extend(['upstream_label','upstream_distance'])
-			elif t == 'downstream':
-				header.extend(['downstream','distance'])
-				columns.extend(['downstream_label','downstream_distance'])
-			elif t == 'region':
-				header.extend(['chr','region','start','stop'])
-				columns.extend(['region_chr','region_label','region_start','region_stop'])
-			elif t == 'group':
-				header.extend(['group'])
-				columns.extend(['group_label'])
-			elif t == 'source':
-				header.extend(['source'])
-				columns.extend(['source_label'])
-			elif t == 'gwas':
-				header.extend(['trait','snps','OR/beta','allele95%CI','riskAfreq','pubmed'])
-				columns.extend(['gwas_trait','gwas_snps','gwas_orbeta','gwas_allele95ci','gwas_riskAfreq','gwas_pubmed'])
-			elif t == 'snpinput':
-				header.extend(['user_input'])
-				columns.extend(['snp_label'])
-			elif t == 'positioninput':
-				header.extend(['user_input'])
-				columns.extend(['position_label'])
-			elif t == 'geneinput':
-				header.extend(['user_input'])
-				columns.extend(['gene_label'])
-			elif t == 'regioninput':
-				header.extend(['user_input'])
-				columns.extend(['region_label'])
-			elif t == 'groupinput':
-				header.extend(['user_input'])
-				columns.extend(['group_label'])
-			elif t == 'sourceinput':
-				header.extend(['user_input'])
-				columns.extend(['source_label'])
-			elif t == 'disease':
-				header.extend(['disease','disease_category'])
-				columns.extend(['disease_label','disease_category'])
+			if t in self._outputTypeHeaderColumns:
+				h,c = self._outputTypeHeaderColumns[t]
+				header.extend(h)
+				columns.extend(c)
 			elif t in self._queryColumnSources:
 				header.append(t)
 				columns.append(t)
@@ -3494,58 +3714,92 @@ JOIN `db`.`biopolymer` AS d_b
 			raise Exception("annotation with no extra columns")
 		queryA = self.buildQuery(mode='annotate', focus='alt', select=columnsA, where=conditionsA, applyOffset=applyOffset)
 		lenA = len(queryA['_columns'])
+		# also return the filter result's sequence number, so that all annotation
+		# queries can be run in one executemany() and matched back up to their filter result
+		n += 1
+		queryA['_columns'].append('_seq')
+		queryA['SELECT']['_seq'] = "?%d" % n
 		sqlA = self.getQueryText(queryA, noRowIDs=True, sortRowIDs=True, splitRowIDs=True)
 		self.prepareTablesForQuery(queryA)
 		
+		# an annotation result is redundant if an earlier one for the same filter
+		# result has the same rowid in every column where this one is non-empty;
+		# rather than expanding each kept result into every blanked-out variant,
+		# index the kept results only by the non-empty column patterns actually seen
+		# (each with its own itemgetter); the caller checks for exact repeats first
+		def isNewAnnotation(rowidA, keptA, projA):
+			cols = tuple(n for n,v in enumerate(rowidA) if v != '')
+			if cols not in projA:
+				getter = operator.itemgetter(*cols) if cols else (lambda k: ())
+				projA[cols] = (getter, set(map(getter, keptA)))
+			getter,proj = projA[cols]
+			if getter(rowidA) in proj:
+				return False
+			keptA.add(rowidA)
+			for getter,proj in projA.values():
+				proj.add(getter(rowidA))
+			return True
+		#isNewAnnotation()
+		
 		# generate filtered results and annotate each of them
 		cursorF = self._loki._db.cursor()
 		cursorA = self._loki._db.cursor()
 		if self._options.debug_query:
 			self.warn("========== annotation : filter step ==========\n")
 			self.warn(sqlF+"\n")
-			for row in cursorF.execute("EXPLAIN QUERY PLAN "+sqlF):
-				self.warn(str(row)+"\n")
+			self.warn(self.getQueryPlanText(sqlF))
 			self.warn("========== annotation : annotate step ==========\n")
 			self.warn(sqlA+"\n")
-			emptyF = (0,) * (len(queryF['_columns']) + len(queryF['_rowid']))
-			for row in cursorF.execute("EXPLAIN QUERY PLAN "+sqlA, emptyF):
-				self.warn(str(row)+"\n")
-		elif self._options.allow_duplicate_output == 'yes':
-			headerF[0] = "#" + headerF[0]
-			yield tuple(headerF + headerA)
-			lastF = None
-			emptyA = tuple(None for c in columnsA)
-			for rowF in cursorF.execute(sqlF):
-				if lastF != rowF[-1]:
-					lastF = rowF[-1]
-					idsA = set()
-					for rowA in cursorA.execute(sqlA, rowF[:-1]):
-						rowidA = rowA[lenA:]
-						if rowidA not in idsA:
-							idsA.update(itertools.product(*( (v,) if v == '' else (v,'') for v in rowidA )))
-							yield rowF[:lenF] + rowA[:lenA]
-					#foreach annotation result
-					if not idsA:
-						yield rowF[:lenF] + emptyA
-				#if filter result is new
-			#foreach filter result
+			emptyF = (0,) * n
+			self.warn(self.getQueryPlanText(sqlA, emptyF))
 		else:
 			headerF[0] = "#" + headerF[0]
 			yield tuple(headerF + headerA)
 			emptyA = tuple(None for c in columnsA)
-			for rowF in cursorF.execute(sqlF):
-					idsA = set()
-					for rowA in cursorA.execute(sqlA, rowF[:-1]):
-						rowidA = rowA[lenA:]
-						if rowidA not in idsA:
-							idsA.update(itertools.product(*( (v,) if v == '' else (v,'') for v in rowidA )))
-							# return annotation results
-							yield rowF[:lenF] + rowA[:lenA]
-					#foreach annotation result
-					if not idsA:
+			skipRepeats = (self._options.allow_duplicate_output == 'yes')
+			
+			# queue each filter result as its annotation query bindings are generated
+			pendingF = collections.deque()
+			def generateBindingsA():
+				seq = 0
+				lastF = None
+				for rowF in cursorF.execute(sqlF):
+					if skipRepeats and (lastF == rowF[-1]):
+						continue
+					lastF = rowF[-1]
+					pendingF.append(rowF)
+					yield rowF[:-1] + (seq,)
+					seq += 1
+			#generateBindingsA()
+			
+			# annotation results arrive grouped by filter result, in order
+			# (this is the innermost loop of annotation, so keep per-row work to slicing and set lookups)
+			seqF = 0
+			outF = None
+			keptA = set()
+			projA = dict()
+			for rowA in cursorA.executemany(sqlA, generateBindingsA()):
+				while rowA[lenA] > seqF:
+					rowF = pendingF.popleft()
+					if not keptA:
 						yield rowF[:lenF] + emptyA
-				#if filter result is new
-			#foreach filter result
+					seqF += 1
+					outF = None
+					keptA = set()
+					projA = dict()
+				if outF == None:
+					outF = pendingF[0][:lenF]
+				rowidA = rowA[lenA+1:]
+				if (rowidA not in keptA) and isNewAnnotation(rowidA, keptA, projA):
+					# return annotation results
+					yield outF + rowA[:lenA]
+			#foreach annotation result
+			while pendingF:
+				rowF = pendingF.popleft()
+				if not keptA:
+					yield rowF[:lenF] + emptyA
+				keptA = set()
+			#foreach remaining filter result
 	#generateAnnotationOutput()
 	
 	
@@ -3568,8 +3822,9 @@ JOIN `db`.`biopolymer` AS d_b
 			self.log("identifying main model candidiates ...")
 			query = self.buildQuery(mode='modelgene', focus='main', select=['gene_id' if self._onlyGeneModels else 'biopolymer_id'])
 			sql = "INSERT OR IGNORE INTO `cand`.`main_biopolymer` (biopolymer_id, flag) VALUES (?,0)"
-			cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
-			numCand = max(row[0] for row in cursor.execute("SELECT COUNT() FROM `cand`.`main_biopolymer`"))
+			with self._loki._db:
+				cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
+			numCand = next(cursor.execute("SELECT COUNT() FROM `cand`.`main_biopolymer`"))[0]
 			self.log(" OK: %d candidates\n" % numCand)
 			self._inputFilters['cand']['main_biopolymer'] = 1
 		#if any main filters other than group/source
@@ -3579,8 +3834,9 @@ JOIN `db`.`biopolymer` AS d_b
 			self.log("identifying alternate model candidiates ...")
 			query = self.buildQuery(mode='modelgene', focus='alt', select=['gene_id' if self._onlyGeneModels else 'biopolymer_id'])
 			sql = "INSERT OR IGNORE INTO `cand`.`alt_biopolymer` (biopolymer_id, flag) VALUES (?,0)"
-			cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
-			numCand = max(row[0] for row in cursor.execute("SELECT COUNT() FROM `cand`.`alt_biopolymer`"))
+			with self._loki._db:
+				cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
+			numCand = next(cursor.execute("SELECT COUNT() FROM `cand`.`alt_biopolymer`"))[0]
 			self.log(" OK: %d candidates\n" % numCand)
 			self._inputFilters['cand']['alt_biopolymer'] = 1
 		#if any alt filters other than group/source
@@ -3602,35 +3858,36 @@ JOIN `db`.`biopolymer` AS d_b
 		# identify candidiates from applicable main filters
 		if sum(filters for table,filters in self._inputFilters['main'].items() if table in ('group','source')):
 			query = self.buildQuery(mode='modelgroup', focus='main', select=['group_id'])
-			if self._inputFilters['cand']['group']:
-				cursor.execute("UPDATE `cand`.`group` SET flag = 0")
-				sql = "UPDATE `cand`.`group` SET flag = 1 WHERE group_id = ?"
-			else:
-				sql = "INSERT OR IGNORE INTO `cand`.`group` (group_id, flag) VALUES (?,0)"
-			cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
-			if self._inputFilters['cand']['group']:
-				cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
+			with self._loki._db:
+				if self._inputFilters['cand']['group']:
+					cursor.execute("UPDATE `cand`.`group` SET flag = 0")
+					sql = "UPDATE `cand`.`group` SET flag = 1 WHERE group_id = ?"
+				else:
+					sql = "INSERT OR IGNORE INTO `cand`.`group` (group_id, flag) VALUES (?,0)"
+				cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
+				if self._inputFilters['cand']['group']:
+					cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
 			self._inputFilters['cand']['group'] = 1
 		#if any main group/source filters
 		
 		# identify candidiates from applicable alt filters
 		if sum(filters for table,filters in self._inputFilters['alt'].items() if table in ('group','source')):
 			query = self.buildQuery(mode='modelgroup', focus='alt', select=['group_id'])
-			if self._inputFilters['cand']['group']:
-				cursor.execute("UPDATE `cand`.`group` SET flag = 0")
-				sql = "UPDATE `cand`.`group` SET flag = 1 WHERE group_id = ?"
-			else:
-				sql = "INSERT OR IGNORE INTO `cand`.`group` (group_id, flag) VALUES (?,0)"
-			cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
-			if self._inputFilters['cand']['group']:
-				cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
+			with self._loki._db:
+				if self._inputFilters['cand']['group']:
+					cursor.execute("UPDATE `cand`.`group` SET flag = 0")
+					sql = "UPDATE `cand`.`group` SET flag = 1 WHERE group_id = ?"
+				else:
+					sql = "INSERT OR IGNORE INTO `cand`.`group` (group_id, flag) VALUES (?,0)"
+				cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
+				if self._inputFilters['cand']['group']:
+					cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
 			self._inputFilters['cand']['group'] = 1
 		#if any main group/source filters
 		
 		# identify candidiates by size
 		query = self.buildQuery(mode='modelgroup', focus='cand', select=['group_id'], having={('gene_id' if self._onlyGeneModels else 'biopolymer_id'):{'!= 0'}})
 		if self._inputFilters['cand']['group']:
-			cursor.execute("UPDATE `cand`.`group` SET flag = 0")
 			sql = "UPDATE `cand`.`group` SET flag = 1 WHERE group_id = ?"
 		else:
 			sql = "INSERT OR IGNORE INTO `cand`.`group` (group_id, flag) VALUES (?,0)"
@@ -3646,12 +3903,15 @@ JOIN `db`.`biopolymer` AS d_b
 				else:
 					query['HAVING'].add("COUNT(DISTINCT %s) >= 2" % (source[2],))
 				break
-		cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
-		if self._inputFilters['cand']['group']:
-			cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
+		with self._loki._db:
+			if self._inputFilters['cand']['group']:
+				cursor.execute("UPDATE `cand`.`group` SET flag = 0")
+			cursor.executemany(sql, self.generateQueryResults(query, allowDupes=True))
+			if self._inputFilters['cand']['group']:
+				cursor.execute("DELETE FROM `cand`.`group` WHERE flag = 0")
 		self._inputFilters['cand']['group'] = 1
 		
-		numCand = max(row[0] for row in cursor.execute("SELECT COUNT() FROM `cand`.`group`"))
+		numCand = next(cursor.execute("SELECT COUNT() FROM `cand`.`group`"))[0]
 		self.log(" OK: %d groups\n" % numCand)
 	#identifyCandidateModelGroups()
 	
@@ -3670,10 +3930,9 @@ JOIN `db`.`biopolymer` AS d_b
 			self.identifyCandidateModelGroups()
 			
 			# build model query
-			formatter = string.Formatter()
 			query = self.buildQuery(mode='model', focus='cand', select=['biopolymer_id_L','biopolymer_id_R','source_id','group_id'])
-			query['GROUP BY'].append(formatter.vformat("MIN({biopolymer_id_L}, {biopolymer_id_R})", args=None, kwargs=query['SELECT']))
-			query['GROUP BY'].append(formatter.vformat("MAX({biopolymer_id_L}, {biopolymer_id_R})", args=None, kwargs=query['SELECT']))
+			query['GROUP BY'].append("MIN({biopolymer_id_L}, {biopolymer_id_R})".format_map(query['SELECT']))
+			query['GROUP BY'].append("MAX({biopolymer_id_L}, {biopolymer_id_R})".format_map(query['SELECT']))
 			query['SELECT']['biopolymer_id_L'] = "MIN(%s)" % query['SELECT']['biopolymer_id_L']
 			query['SELECT']['biopolymer_id_R'] = "MAX(%s)" % query['SELECT']['biopolymer_id_R']
 			query['SELECT']['source_id'] = "COUNT(DISTINCT %s)" % query['SELECT']['source_id']
@@ -3681,8 +3940,8 @@ JOIN `db`.`biopolymer` AS d_b
 			if self._options.minimum_model_score > 0:
 				query['HAVING'].add("%s >= %d" % (query['SELECT']['source_id'],self._options.minimum_model_score))
 			if self._options.sort_models == 'yes':
-				query['ORDER BY'].append(formatter.vformat("{source_id} DESC", args=None, kwargs=query['SELECT']))
-				query['ORDER BY'].append(formatter.vformat("{group_id} DESC", args=None, kwargs=query['SELECT']))
+				query['ORDER BY'].append("{source_id} DESC".format_map(query['SELECT']))
+				query['ORDER BY'].append("{group_id} DESC".format_map(query['SELECT']))
 			if self._options.maximum_model_count > 0:
 				query['LIMIT'] = self._options.maximum_model_count
 			
@@ -3746,31 +4005,61 @@ JOIN `db`.`biopolymer` AS d_b
 		if self._options.debug_query:
 			self.log(sqlL+"\n")
 			self.log("-----\n")
-			for row in cursor.execute("EXPLAIN QUERY PLAN "+sqlL, ((1,2,3,4) if self._options.all_pairwise_models != 'yes' else None)):
-				self.log(str(row)+"\n")
+			self.log(self.getQueryPlanText(sqlL, ((1,2,3,4) if self._options.all_pairwise_models != 'yes' else None)))
 			
 			self.log("=====\n")
 			
 			self.log(sqlR+"\n")
 			self.log("-----\n")
-			for row in cursor.execute("EXPLAIN QUERY PLAN "+sqlR, ((1,2,3,4) if self._options.all_pairwise_models != 'yes' else None)):
-				self.log(str(row)+"\n")
+			self.log(self.getQueryPlanText(sqlR, ((1,2,3,4) if self._options.all_pairwise_models != 'yes' else None)))
 		elif self._options.all_pairwise_models != 'yes':
 			# expand each gene-gene model
 			diffTypes = (typesL != typesR)
 			headerR.append('score(src-grp)')
 			yield tuple(headerL + headerR)
+			# sqlL and sqlR are re-executed for many models, so if this apsw can
+			# pass prepare flags, tell SQLite to keep them prepared long-term
+			prepare = dict()
+			if hasattr(apsw, 'SQLITE_PREPARE_PERSISTENT'):
+				try:
+					cursor.execute("SELECT 1", prepare_flags=apsw.SQLITE_PREPARE_PERSISTENT)
+					prepare['prepare_flags'] = apsw.SQLITE_PREPARE_PERSISTENT
+				except TypeError: # older apsw has no Cursor.execute(prepare_flags)
+					pass
+			
+			# each side's expansion depends only on that side's gene, and the same
+			# genes recur across many models, so remember the most recently used
+			# expansions (split into (rowid,output)) rather than re-querying them
+			cacheSize = 4096
+			expandedL = collections.OrderedDict()
+			expandedR = collections.OrderedDict()
+			def expandModel(sql, model, gene, expanded):
+				if gene in expanded:
+					expanded.move_to_end(gene)
+				else:
+					expanded[gene] = [ (row[-1],row[:-1]) for row in cursor.execute(sql, model, **prepare) ]
+					if len(expanded) > cacheSize:
+						expanded.popitem(last=False)
+				return expanded[gene]
+			#expandModel()
+			
 			modelIDs = set()
 			for model in self.getGeneModels():
 				score = ('%d-%d' % (model[2],model[3]),)
-				# store the expanded right-hand side, then pair them all with the expanded left-hand side
-				listR = list(cursor.execute(sqlR, model))
-				for row in cursor.execute(sqlL, model):
-					for modelR in listR:
-						modelID = (row[-1],modelR[-1]) if (diffTypes or (row[-1] <= modelR[-1])) else (modelR[-1],row[-1])
-						if (diffTypes or (row[-1] != modelR[-1])) and (modelID not in modelIDs):
+				# pair each expanded left-hand side with each expanded right-hand side
+				listR = expandModel(sqlR, model, model[1], expandedR)
+				for idL,outL in expandModel(sqlL, model, model[0], expandedL):
+					for idR,outR in listR:
+						# rowids may be packed integers or text, so don't order them
+						if diffTypes:
+							modelID = (idL,idR)
+						elif idL != idR:
+							modelID = frozenset((idL,idR))
+						else:
+							continue
+						if modelID not in modelIDs:
 							modelIDs.add(modelID)
-							yield row[:-1] + modelR[:-1] + score
+							yield outL + outR + score
 							if limit and len(modelIDs) >= limit:
 								return
 					#foreach right-hand
@@ -3780,28 +4069,70 @@ JOIN `db`.`biopolymer` AS d_b
 			yield tuple(headerL + headerR)
 			n = 0
 			
-			# first query the right-hand side results and store them
+			# first query the right-hand side results and store their outputs,
+			# along with the position of each rowid in the list; if there turn
+			# out to be too many to pair up efficiently in python, stop and spill
+			# both sides to temp tables instead so that SQLite can pair them itself
+			spillSize = 1024
 			listR = list()
-			rowIDs = set()
+			indexR = dict()
+			spill = True
 			for row in cursor.execute(sqlR):
-				if row[-1] not in rowIDs:
-					rowIDs.add(row[-1])
-					listR.append(row)
-			del rowIDs
-			
-			# now query the left-hand side results and pair each with the stored right-hand sides
-			rowIDs = set()
+				if row[-1] not in indexR:
+					if len(listR) >= spillSize:
+						break
+					indexR[row[-1]] = len(listR)
+					listR.append(row[:-1])
+			else:
+				# only spill if a row past the limit was found, not when there are exactly spillSize of them
+				spill = False
 			diffCols = (columnsL != columnsR)
-			for row in cursor.execute(sqlL):
-				if row[-1] not in rowIDs:
-					rowIDs.add(row[-1])
-					for modelR in listR:
-						if diffCols or row[-1] != modelR[-1]:
+			
+			if not spill:
+				# now query the left-hand side results and pair each with the stored right-hand sides,
+				# skipping only the one (if any) with the same rowid when both sides are the same columns
+				rowIDs = set()
+				for row in cursor.execute(sqlL):
+					if row[-1] not in rowIDs:
+						rowIDs.add(row[-1])
+						outL = row[:-1]
+						skip = None if diffCols else indexR.get(row[-1])
+						if skip == None:
+							pairsR = listR
+						else:
+							pairsR = itertools.chain(itertools.islice(listR, 0, skip), itertools.islice(listR, skip + 1, None))
+						for outR in pairsR:
 							n += 1
-							yield row[:-1] + modelR[:-1]
+							yield outL + outR
 							if limit and n >= limit:
 								return
-			del rowIDs
+				del rowIDs
+			else:
+				del listR
+				del indexR
+				# store both sides in temp tables (deduplicated by rowid, in result order) and cross join them there
+				for side,sql,numCols in (('L',sqlL,len(queryL['_columns'])),('R',sqlR,len(queryR['_columns']))):
+					cursor.execute("DROP TABLE IF EXISTS `temp`.`model_%s`" % side)
+					cursor.execute("CREATE TEMP TABLE `model_%s` (%s, _rowid UNIQUE)" % (side,", ".join("c%d" % c for c in range(numCols))))
+					with self._loki._db:
+						cursor.executemany(
+							"INSERT OR IGNORE INTO `temp`.`model_%s` VALUES (%s)" % (side,",".join("?" * (numCols + 1))),
+							self._loki._db.cursor().execute(sql)
+						)
+				#foreach side
+				sql = "SELECT %s, %s FROM `temp`.`model_L` AS l CROSS JOIN `temp`.`model_R` AS r" % (
+					", ".join("l.c%d" % c for c in range(len(queryL['_columns']))),
+					", ".join("r.c%d" % c for c in range(len(queryR['_columns'])))
+				)
+				if not diffCols:
+					sql += " WHERE l._rowid != r._rowid"
+				if limit:
+					sql += " LIMIT %d" % limit
+				for row in cursor.execute(sql):
+					yield row
+				cursor.execute("DROP TABLE `temp`.`model_L`")
+				cursor.execute("DROP TABLE `temp`.`model_R`")
+			#if spill
 		#if debug/normal/pairwise
 	#generateModelOutput()
 	
@@ -3837,7 +4168,9 @@ For detailed information on each command-line argument and its usage, please ref
 if __name__ == "__main__":
 	
 	# define the arguments parser
-	version = "Biofilter version %s" % (Biofilter.getVersionString())
+	bioVersion = Biofilter.getVersionString()
+	lokiVersion = loki_db.Database.getVersionString()
+	version = "Biofilter version %s" % (bioVersion)
 	parser = argparse.ArgumentParser(
 		description=version,
 		add_help=False,
@@ -3903,308 +4236,317 @@ if __name__ == "__main__":
 		raise argparse.ArgumentTypeError("'%s' must be significant, insignificant or ignore" % (val,))
 	#typePZPV()
 	
-	# add general configuration section
-	group = parser.add_argument_group("Configuration Options")
-	group.add_argument('--help', '-h', action='help', help="show this help message and exit")
-	group.add_argument('--version', action='version', help="show all software version numbers and exit",
-			version=version+"""
+	# define all options as (group, ((names, settings), ...)) and register them in one pass
+	argSpecs = (
+		# add general configuration section
+		("Configuration Options", (
+			(('--help', '-h'), dict(action='help', help="show this help message and exit")),
+			(('--version',), dict(action='version', help="show all software version numbers and exit",
+				version=version+"""
 %9s version %s
 %9s version %s
 %9s version %s
 """ % (
-				"LOKI",
-				loki_db.Database.getVersionString(),
-				loki_db.Database.getDatabaseDriverName(),
-				loki_db.Database.getDatabaseDriverVersion(),
-				loki_db.Database.getDatabaseInterfaceName(),
-				loki_db.Database.getDatabaseInterfaceVersion()
-			)
-	)
-	group.add_argument('configuration', type=str, metavar='configuration_file', nargs='*', default=None,
-			help="a file from which to read additional options"
-	)
-	group.add_argument('--report-configuration', '--rc', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="output a report of all effective options, including any defaults, in a configuration file format which can be re-input (default: no)"
-	)
-	group.add_argument('--report-replication-fingerprint', '--rrf', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="include software versions and the knowledge database file's fingerprint values in the configuration report, to ensure the same data is used in replication (default: no)"
-	)
-	group.add_argument('--random-number-generator-seed', '--rngs', type=str, metavar='seed', nargs='?', const='', default=None,
-			help="seed value for the PRNG, or blank to use the sytem default (default: blank)"
-	)
-	
-	# add knowledge database section
-	group = parser.add_argument_group("Prior Knowledge Options")
-	group.add_argument('--knowledge', '-k', type=str, metavar='file', #default=argparse.SUPPRESS,
-			help="the prior knowledge database file to use"
-	)
-	group.add_argument('--report-genome-build', '--rgb', type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
-			help="report the genome build version number used by the knowledge database (default: yes)"
-	)
-	group.add_argument('--report-gene-name-stats', '--rgns', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="display statistics on available gene identifier types (default: no)"
-	)
-	group.add_argument('--report-group-name-stats', '--runs', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="display statistics on available group identifier types (default: no)"
-	)
-	group.add_argument('--allow-unvalidated-snp-positions', '--ausp', type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
-			help="use unvalidated SNP positions in the knowledge database (default: yes)"
-	)
-	group.add_argument('--allow-ambiguous-snps', '--aas', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="use SNPs which have ambiguous loci in the knowledge database (default: no)"
-	)
-	group.add_argument('--allow-ambiguous-knowledge', '--aak', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="use ambiguous group<->gene associations in the knowledge database (default: no)"
-	)
-	group.add_argument('--reduce-ambiguous-knowledge', '--rak', type=str, metavar='no/implication/quality/any', nargs='?', const='any', default='no',
-			choices=['no','implication','quality','any'],
-			help="attempt to reduce ambiguity in the knowledge database using a heuristic strategy, from 'no', 'implication', 'quality' or 'any' (default: no)"
-	)
-	group.add_argument('--report-ld-profiles', '--rlp', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="display the available LD profiles and their properties (default: no)"
-	)
-	group.add_argument('--ld-profile', '--lp', type=str, metavar='profile', nargs='?', const=None, default=None,
-			help="LD profile with which to adjust regions in the knowledge database (default: none)"
-	)
-	group.add_argument('--verify-biofilter-version', type=str, metavar='version', default=None,
-			help="require a specific Biofilter software version to replicate results"
-	)
-	group.add_argument('--verify-loki-version', type=str, metavar='version', default=None,
-			help="require a specific LOKI software version to replicate results"
-	)
-	group.add_argument('--verify-source-loader', type=str, metavar=('source','version'), nargs=2, action='append', default=None,
-			help="require that the knowledge database was built with a specific source loader version"
-	)
-	group.add_argument('--verify-source-option', type=str, metavar=('source','option','value'), nargs=3, action='append', default=None,
-			help="require that the knowledge database was built with a specific source loader option"
-	)
-	group.add_argument('--verify-source-file', type=str, metavar=('source','file','date','size','md5'), nargs=5, action='append', default=None,
-			help="require that the knowledge database was built with a specific source file fingerprint"
-	)
-	group.add_argument('--user-defined-knowledge', '--udk', type=str, metavar='file', nargs='+', default=None,
-			help="file(s) from which to load user-defined knowledge"
-	)
-	group.add_argument('--user-defined-filter', '--udf', type=str, metavar='no/group/gene', default='no',
-			choices=['no','group','gene'],
-			help="method by which user-defined knowledge will also be applied as a filter on other prior knowledge, from 'no', 'group' or 'gene' (default: no)"
-	)
-	
-	# add primary input section
-	group = parser.add_argument_group("Input Data Options")
-	group.add_argument('--snp', '-s', type=str, metavar='rs#', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input SNPs, specified by RS#"
-	)
-	group.add_argument('--snp-file', '-S', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input SNPs"
-	)
-	group.add_argument('--position', '-p', type=str, metavar='position', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input positions, specified by chromosome and basepair coordinate"
-	)
-	group.add_argument('--position-file', '-P', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input positions"
-	)
-	group.add_argument('--gene', '-g', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input genes, specified by name"
-	)
-	group.add_argument('--gene-file', '-G', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input genes"
-	)
-	group.add_argument('--gene-identifier-type', '--git', type=str, metavar='type', nargs='?', const='*', default='-',
-			help="the default type of any gene identifiers without types, or a special type '=', '-' or '*' (default: '-' for primary labels)"
-	)
-	group.add_argument('--allow-ambiguous-genes', '--aag', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="use ambiguous input gene identifiers by including all possibilities (default: no)"
-	)
-	group.add_argument('--gene-search', '--gs', type=str, metavar='text', nargs='+', action='append',
-			help="find input genes by searching all available names and descriptions"
-	)
-	group.add_argument('--region', '-r', type=str, metavar='region', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input regions, specified by chromosome, start and stop positions"
-	)
-	group.add_argument('--region-file', '-R', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input regions"
-	)
-	group.add_argument('--group', '-u', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input groups, specified by name"
-	)
-	group.add_argument('--group-file', '-U', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input groups"
-	)
-	group.add_argument('--group-identifier-type', '--uit', type=str, metavar='type', nargs='?', const='*', default='-',
-			help="the default type of any group identifiers without types, or a special type '=', '-' or '*' (default: '-' for primary labels)"
-	)
-	group.add_argument('--allow-ambiguous-groups', '--aau', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="use ambiguous input group identifiers by including all possibilities (default: no)"
-	)
-	group.add_argument('--group-search', '--us', type=str, metavar='text', nargs='+', action='append',
-			help="find input groups by searching all available names and descriptions"
-	)
-	group.add_argument('--source', '-c', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="input sources, specified by name"
-	)
-	group.add_argument('--source-file', '-C', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load input sources"
-	)
-	
-	# add alternate input section
-	group = parser.add_argument_group("Alternate Input Data Options")
-	group.add_argument('--alt-snp', '--as', type=str, metavar='rs#', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input SNPs, specified by RS#"
-	)
-	group.add_argument('--alt-snp-file', '--AS', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input SNPs"
-	)
-	group.add_argument('--alt-position', '--ap', type=str, metavar='position', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input positions, specified by chromosome and basepair coordinate"
-	)
-	group.add_argument('--alt-position-file', '--AP', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input positions"
-	)
-	group.add_argument('--alt-gene', '--ag', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input genes, specified by name"
-	)
-	group.add_argument('--alt-gene-file', '--AG', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input genes"
-	)
-	group.add_argument('--alt-gene-search', '--ags', type=str, metavar='text', nargs='+', action='append',
-			help="find alternate input genes by searching all available names and descriptions"
-	)
-	group.add_argument('--alt-region', '--ar', type=str, metavar='region', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input regions, specified by chromosome, start and stop positions"
-	)
-	group.add_argument('--alt-region-file', '--AR', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input regions"
-	)
-	group.add_argument('--alt-group', '--au', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input groups, specified by name"
-	)
-	group.add_argument('--alt-group-file', '--AU', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input groups"
-	)
-	group.add_argument('--alt-group-search', '--aus', type=str, metavar='text', nargs='+', action='append',
-			help="find alternate input groups by searching all available names and descriptions"
-	)
-	group.add_argument('--alt-source', '--ac', type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="alternate input sources, specified by name"
-	)
-	group.add_argument('--alt-source-file', '--AC', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load alternate input sources"
-	)
-	
-	# add positional section
-	group = parser.add_argument_group("Positional Matching Options")
-	group.add_argument('--grch-build-version', '--gbv', type=int, metavar='version', default=None,
-			help="the GRCh# human reference genome build version of position and region inputs",
-	)
-	group.add_argument('--ucsc-build-version', '--ubv', type=int, metavar='version', default=None,
-			help="the UCSC hg# human reference genome build version of position and region inputs",
-	)
-	group.add_argument('--coordinate-base', '--cb', type=int, metavar='offset', default=1,
-			help="the coordinate base for position and region inputs and outputs (default: 1)",
-	)
-	group.add_argument('--regions-half-open', '--rho', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="whether input and output regions are 'half-open' intervals and should not include their end coordinate (default: no)",
-	)
-	group.add_argument('--region-position-margin', '--rpm', type=basepairs, metavar='bases', default=0,
-			help="number of bases beyond the bounds of known regions where positions should still be matched (default: 0)"
-	)
-	group.add_argument('--region-match-percent', '--rmp', type=percent, metavar='percentage', default=None, # default set later, with -bases
-			help="minimum percentage of overlap between two regions to consider them a match (default: 100)"
-	)
-	group.add_argument('--region-match-bases', '--rmb', type=basepairs, metavar='bases', default=None, # default set later, with -percent
-			help="minimum number of bases of overlap between two regions to consider them a match (default: 0)"
-	)
-	
-	# add modeling section
-	group = parser.add_argument_group("Model-Building Options")
-	group.add_argument('--maximum-model-count', '--mmc', type=int, metavar='count', nargs='?', const=0, default=0,
-			help="maximum number of models to generate, or < 1 for unlimited (default: unlimited)"
-	)
-	group.add_argument('--alternate-model-filtering', '--amf', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="apply primary input filters to only one side of generated models (default: no)"
-	)
-	group.add_argument('--all-pairwise-models', '--apm', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="generate all comprehensive pairwise models without regard to any prior knowledge (default: no)"
-	)
-	group.add_argument('--maximum-model-group-size', '--mmgs', type=int, metavar='size', default=30,
-			help="maximum size of a group to use for knowledge-supported models, or < 1 for unlimited (default: 30)"
-	)
-	group.add_argument('--minimum-model-score', '--mms', type=int, metavar='score', default=2,
-			help="minimum implication score for knowledge-supported models (default: 2)"
-	)
-	group.add_argument('--sort-models', '--sm', type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
-			help="output knowledge-supported models in order of descending score (default: yes)"
-	)
-	
-	# add PARIS section
-	group = parser.add_argument_group("PARIS Options")
-	group.add_argument('--paris-p-value', '--ppv', type=zerotoone, metavar='p-value', default=0.05,
-			help="maximum p-value of input results to be considered significant (default: 0.05)"
-	)
-	group.add_argument('--paris-zero-p-values', '--pzpv', type=typePZPV, metavar='sig/insig/ignore', default='ignore',
-			help="how to consider input result p-values of zero (default: ignore)"
-	)
-	group.add_argument('--paris-max-p-value', '--pmpv', type=zerotoone, metavar='p-value', default=None,
-			help="maximum meaningful permutation p-value (default: none)"
-	)
-	group.add_argument('--paris-enforce-input-chromosome', '--peic', type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
-			help="limit input result SNPs to positions on the specified chromosome (default: yes)"
-	)
-	group.add_argument('--paris-permutation-count', '--ppc', type=int, metavar='number', default=1000,
-			help="number of permutations to perform on each group and gene (default: 1000)"
-	)
-	group.add_argument('--paris-bin-size', '--pbs', type=int, metavar='number', default=10000,
-			help="ideal number of features per bin (default: 10000)"
-	)
-	group.add_argument('--paris-snp-file', '--PS', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load SNP results"
-	)
-	group.add_argument('--paris-position-file', '--PP', type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
-			help="file(s) from which to load position results"
-	)
-	group.add_argument('--paris-details', '--pd', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="generate the PARIS detail report (default: no)"
+					"LOKI",
+					lokiVersion,
+					loki_db.Database.getDatabaseDriverName(),
+					loki_db.Database.getDatabaseDriverVersion(),
+					loki_db.Database.getDatabaseInterfaceName(),
+					loki_db.Database.getDatabaseInterfaceVersion()
+				)
+			)),
+			(('configuration',), dict(type=str, metavar='configuration_file', nargs='*', default=None,
+				help="a file from which to read additional options"
+			)),
+			(('--report-configuration', '--rc'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="output a report of all effective options, including any defaults, in a configuration file format which can be re-input (default: no)"
+			)),
+			(('--report-replication-fingerprint', '--rrf'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="include software versions and the knowledge database file's fingerprint values in the configuration report, to ensure the same data is used in replication (default: no)"
+			)),
+			(('--random-number-generator-seed', '--rngs'), dict(type=str, metavar='seed', nargs='?', const='', default=None,
+				help="seed value for the PRNG, or blank to use the sytem default (default: blank)"
+			)),
+		)),
+		# add knowledge database section
+		("Prior Knowledge Options", (
+			(('--knowledge', '-k'), dict(type=str, metavar='file', #default=argparse.SUPPRESS,
+				help="the prior knowledge database file to use"
+			)),
+			(('--report-genome-build', '--rgb'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
+				help="report the genome build version number used by the knowledge database (default: yes)"
+			)),
+			(('--report-gene-name-stats', '--rgns'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="display statistics on available gene identifier types (default: no)"
+			)),
+			(('--report-group-name-stats', '--runs'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="display statistics on available group identifier types (default: no)"
+			)),
+			(('--allow-unvalidated-snp-positions', '--ausp'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
+				help="use unvalidated SNP positions in the knowledge database (default: yes)"
+			)),
+			(('--allow-ambiguous-snps', '--aas'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="use SNPs which have ambiguous loci in the knowledge database (default: no)"
+			)),
+			(('--allow-ambiguous-knowledge', '--aak'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="use ambiguous group<->gene associations in the knowledge database (default: no)"
+			)),
+			(('--reduce-ambiguous-knowledge', '--rak'), dict(type=str, metavar='no/implication/quality/any', nargs='?', const='any', default='no',
+				choices=['no','implication','quality','any'],
+				help="attempt to reduce ambiguity in the knowledge database using a heuristic strategy, from 'no', 'implication', 'quality' or 'any' (default: no)"
+			)),
+			(('--report-ld-profiles', '--rlp'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="display the available LD profiles and their properties (default: no)"
+			)),
+			(('--ld-profile', '--lp'), dict(type=str, metavar='profile', nargs='?', const=None, default=None,
+				help="LD profile with which to adjust regions in the knowledge database (default: none)"
+			)),
+			(('--verify-biofilter-version',), dict(type=str, metavar='version', default=None,
+				help="require a specific Biofilter software version to replicate results"
+			)),
+			(('--verify-loki-version',), dict(type=str, metavar='version', default=None,
+				help="require a specific LOKI software version to replicate results"
+			)),
+			(('--verify-source-loader',), dict(type=str, metavar=('source','version'), nargs=2, action='append', default=None,
+				help="require that the knowledge database was built with a specific source loader version"
+			)),
+			(('--verify-source-option',), dict(type=str, metavar=('source','option','value'), nargs=3, action='append', default=None,
+				help="require that the knowledge database was built with a specific source loader option"
+			)),
+			(('--verify-source-file',), dict(type=str, metavar=('source','file','date','size','md5'), nargs=5, action='append', default=None,
+				help="require that the knowledge database was built with a specific source file fingerprint"
+			)),
+			(('--user-defined-knowledge', '--udk'), dict(type=str, metavar='file', nargs='+', default=None,
+				help="file(s) from which to load user-defined knowledge"
+			)),
+			(('--user-defined-filter', '--udf'), dict(type=str, metavar='no/group/gene', default='no',
+				choices=['no','group','gene'],
+				help="method by which user-defined knowledge will also be applied as a filter on other prior knowledge, from 'no', 'group' or 'gene' (default: no)"
+			)),
+		)),
+		# add primary input section
+		("Input Data Options", (
+			(('--snp', '-s'), dict(type=str, metavar='rs#', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input SNPs, specified by RS#"
+			)),
+			(('--snp-file', '-S'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input SNPs"
+			)),
+			(('--position', '-p'), dict(type=str, metavar='position', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input positions, specified by chromosome and basepair coordinate"
+			)),
+			(('--position-file', '-P'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input positions"
+			)),
+			(('--gene', '-g'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input genes, specified by name"
+			)),
+			(('--gene-file', '-G'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input genes"
+			)),
+			(('--gene-identifier-type', '--git'), dict(type=str, metavar='type', nargs='?', const='*', default='-',
+				help="the default type of any gene identifiers without types, or a special type '=', '-' or '*' (default: '-' for primary labels)"
+			)),
+			(('--allow-ambiguous-genes', '--aag'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="use ambiguous input gene identifiers by including all possibilities (default: no)"
+			)),
+			(('--gene-search', '--gs'), dict(type=str, metavar='text', nargs='+', action='append',
+				help="find input genes by searching all available names and descriptions"
+			)),
+			(('--region', '-r'), dict(type=str, metavar='region', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input regions, specified by chromosome, start and stop positions"
+			)),
+			(('--region-file', '-R'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input regions"
+			)),
+			(('--group', '-u'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input groups, specified by name"
+			)),
+			(('--group-file', '-U'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input groups"
+			)),
+			(('--group-identifier-type', '--uit'), dict(type=str, metavar='type', nargs='?', const='*', default='-',
+				help="the default type of any group identifiers without types, or a special type '=', '-' or '*' (default: '-' for primary labels)"
+			)),
+			(('--allow-ambiguous-groups', '--aau'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="use ambiguous input group identifiers by including all possibilities (default: no)"
+			)),
+			(('--group-search', '--us'), dict(type=str, metavar='text', nargs='+', action='append',
+				help="find input groups by searching all available names and descriptions"
+			)),
+			(('--source', '-c'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="input sources, specified by name"
+			)),
+			(('--source-file', '-C'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load input sources"
+			)),
+		)),
+		# add alternate input section
+		("Alternate Input Data Options", (
+			(('--alt-snp', '--as'), dict(type=str, metavar='rs#', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input SNPs, specified by RS#"
+			)),
+			(('--alt-snp-file', '--AS'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input SNPs"
+			)),
+			(('--alt-position', '--ap'), dict(type=str, metavar='position', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input positions, specified by chromosome and basepair coordinate"
+			)),
+			(('--alt-position-file', '--AP'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input positions"
+			)),
+			(('--alt-gene', '--ag'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input genes, specified by name"
+			)),
+			(('--alt-gene-file', '--AG'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input genes"
+			)),
+			(('--alt-gene-search', '--ags'), dict(type=str, metavar='text', nargs='+', action='append',
+				help="find alternate input genes by searching all available names and descriptions"
+			)),
+			(('--alt-region', '--ar'), dict(type=str, metavar='region', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input regions, specified by chromosome, start and stop positions"
+			)),
+			(('--alt-region-file', '--AR'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input regions"
+			)),
+			(('--alt-group', '--au'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input groups, specified by name"
+			)),
+			(('--alt-group-file', '--AU'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input groups"
+			)),
+			(('--alt-group-search', '--aus'), dict(type=str, metavar='text', nargs='+', action='append',
+				help="find alternate input groups by searching all available names and descriptions"
+			)),
+			(('--alt-source', '--ac'), dict(type=str, metavar='name', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="alternate input sources, specified by name"
+			)),
+			(('--alt-source-file', '--AC'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load alternate input sources"
+			)),
+		)),
+		# add positional section
+		("Positional Matching Options", (
+			(('--grch-build-version', '--gbv'), dict(type=int, metavar='version', default=None,
+				help="the GRCh# human reference genome build version of position and region inputs",
+			)),
+			(('--ucsc-build-version', '--ubv'), dict(type=int, metavar='version', default=None,
+				help="the UCSC hg# human reference genome build version of position and region inputs",
+			)),
+			(('--coordinate-base', '--cb'), dict(type=int, metavar='offset', default=1,
+				help="the coordinate base for position and region inputs and outputs (default: 1)",
+			)),
+			(('--regions-half-open', '--rho'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="whether input and output regions are 'half-open' intervals and should not include their end coordinate (default: no)",
+			)),
+			(('--region-position-margin', '--rpm'), dict(type=basepairs, metavar='bases', default=0,
+				help="number of bases beyond the bounds of known regions where positions should still be matched (default: 0)"
+			)),
+			(('--region-match-percent', '--rmp'), dict(type=percent, metavar='percentage', default=None, # default set later, with -bases
+				help="minimum percentage of overlap between two regions to consider them a match (default: 100)"
+			)),
+			(('--region-match-bases', '--rmb'), dict(type=basepairs, metavar='bases', default=None, # default set later, with -percent
+				help="minimum number of bases of overlap between two regions to consider them a match (default: 0)"
+			)),
+		)),
+		# add modeling section
+		("Model-Building Options", (
+			(('--maximum-model-count', '--mmc'), dict(type=int, metavar='count', nargs='?', const=0, default=0,
+				help="maximum number of models to generate, or < 1 for unlimited (default: unlimited)"
+			)),
+			(('--alternate-model-filtering', '--amf'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="apply primary input filters to only one side of generated models (default: no)"
+			)),
+			(('--all-pairwise-models', '--apm'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="generate all comprehensive pairwise models without regard to any prior knowledge (default: no)"
+			)),
+			(('--maximum-model-group-size', '--mmgs'), dict(type=int, metavar='size', default=30,
+				help="maximum size of a group to use for knowledge-supported models, or < 1 for unlimited (default: 30)"
+			)),
+			(('--minimum-model-score', '--mms'), dict(type=int, metavar='score', default=2,
+				help="minimum implication score for knowledge-supported models (default: 2)"
+			)),
+			(('--sort-models', '--sm'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
+				help="output knowledge-supported models in order of descending score (default: yes)"
+			)),
+		)),
+		# add PARIS section
+		("PARIS Options", (
+			(('--paris-p-value', '--ppv'), dict(type=zerotoone, metavar='p-value', default=0.05,
+				help="maximum p-value of input results to be considered significant (default: 0.05)"
+			)),
+			(('--paris-zero-p-values', '--pzpv'), dict(type=typePZPV, metavar='sig/insig/ignore', default='ignore',
+				help="how to consider input result p-values of zero (default: ignore)"
+			)),
+			(('--paris-max-p-value', '--pmpv'), dict(type=zerotoone, metavar='p-value', default=None,
+				help="maximum meaningful permutation p-value (default: none)"
+			)),
+			(('--paris-enforce-input-chromosome', '--peic'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='yes',
+				help="limit input result SNPs to positions on the specified chromosome (default: yes)"
+			)),
+			(('--paris-permutation-count', '--ppc'), dict(type=int, metavar='number', default=1000,
+				help="number of permutations to perform on each group and gene (default: 1000)"
+			)),
+			(('--paris-bin-size', '--pbs'), dict(type=int, metavar='number', default=10000,
+				help="ideal number of features per bin (default: 10000)"
+			)),
+			(('--paris-snp-file', '--PS'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load SNP results"
+			)),
+			(('--paris-position-file', '--PP'), dict(type=str, metavar='file', nargs='+', action='append', #default=argparse.SUPPRESS,
+				help="file(s) from which to load position results"
+			)),
+			(('--paris-details', '--pd'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="generate the PARIS detail report (default: no)"
+			)),
+		)),
+		# add output section
+		("Output Options", (
+			(('--quiet', '-q'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="don't print any warnings or log messages to <stdout> (default: no)"
+			)),
+			(('--verbose', '-v'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="print additional informational log messages to <stdout> (default: no)"
+			)),
+			(('--prefix',), dict(type=str, metavar='prefix', default='biofilter',
+				help="prefix to use for all output filenames; may contain path components (default: 'biofilter')"
+			)),
+			(('--overwrite',), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="overwrite any existing output files (default: no)",
+			)),
+			(('--stdout',), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="display all output data directly on <stdout> rather than writing to any files (default: no)"
+			)),
+			(('--report-invalid-input', '--rii'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="report invalid input data lines in a separate output file for each type (default: no)"
+			)),
+			(('--filter', '-f'), dict(type=str, metavar='type', nargs='+', action='append',
+				help="data types or columns to include in the filtered output"
+			)),
+			(('--annotate', '-a'), dict(type=str, metavar='type', nargs='+', action='append',
+				help="data types or columns to include in the annotated output"
+			)),
+			(('--model', '-m'), dict(type=str, metavar='type', nargs='+', action='append',
+				help="data types or columns to include in the output models"
+			)),
+			(('--paris',), dict(type=str, metavar='yes/no', nargs='?', const='yes', default='no',
+				help="perform a PARIS analysis with the provided input data (default: no)"
+			)),
+		)),
+		# add hidden options
+		(None, (
+			(('--allow-duplicate-output', '--ado'), dict(type=yesno, metavar='yes/no', nargs='?', const='yes', default='no', help=argparse.SUPPRESS)),
+			(('--debug-logic',), dict(action='store_true', help=argparse.SUPPRESS)),
+			(('--debug-query',), dict(action='store_true', help=argparse.SUPPRESS)),
+			(('--debug-profile',), dict(action='store_true', help=argparse.SUPPRESS)),
+		)),
 	)
-	
-	# add output section
-	group = parser.add_argument_group("Output Options")
-	group.add_argument('--quiet', '-q', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="don't print any warnings or log messages to <stdout> (default: no)"
-	)
-	group.add_argument('--verbose', '-v', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="print additional informational log messages to <stdout> (default: no)"
-	)
-	group.add_argument('--prefix', type=str, metavar='prefix', default='biofilter',
-			help="prefix to use for all output filenames; may contain path components (default: 'biofilter')"
-	)
-	group.add_argument('--overwrite', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="overwrite any existing output files (default: no)",
-	)
-	group.add_argument('--stdout', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="display all output data directly on <stdout> rather than writing to any files (default: no)"
-	)
-	group.add_argument('--report-invalid-input', '--rii', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="report invalid input data lines in a separate output file for each type (default: no)"
-	)
-	group.add_argument('--filter', '-f', type=str, metavar='type', nargs='+', action='append',
-			help="data types or columns to include in the filtered output"
-	)
-	group.add_argument('--annotate', '-a', type=str, metavar='type', nargs='+', action='append',
-			help="data types or columns to include in the annotated output"
-	)
-	group.add_argument('--model', '-m', type=str, metavar='type', nargs='+', action='append',
-			help="data types or columns to include in the output models"
-	)
-	group.add_argument('--paris', type=str, metavar='yes/no', nargs='?', const='yes', default='no',
-			help="perform a PARIS analysis with the provided input data (default: no)"
-	)
-	
-	# add hidden options
-	parser.add_argument('--end-of-line', action='store_true', help=argparse.SUPPRESS)
-	parser.add_argument('--allow-duplicate-output', '--ado', type=yesno, metavar='yes/no', nargs='?', const='yes', default='no', help=argparse.SUPPRESS)
-	parser.add_argument('--debug-logic', action='store_true', help=argparse.SUPPRESS)
-	parser.add_argument('--debug-query', action='store_true', help=argparse.SUPPRESS)
-	parser.add_argument('--debug-profile', action='store_true', help=argparse.SUPPRESS)
+	for groupName,groupSpecs in argSpecs:
+		group = parser if (groupName == None) else parser.add_argument_group(groupName)
+		for names,settings in groupSpecs:
+			group.add_argument(*names, **settings)
+	#foreach group
 	
 	# if there are no arguments, just print usage and exit
 	if len(sys.argv) < 2:
@@ -4221,7 +4563,7 @@ if __name__ == "__main__":
 
 	1. **OrderedNamespace**: Defines a custom namespace class that preserves the order of attribute additions.
 
-	2. **cfDialect**: Defines a custom CSV dialect named `cfDialect` for configuration files, ensuring compatibility with quoted substrings.
+	2. **cfDialect**: Uses the module-level CSV dialect `cfDialect` (registered as 'biofilter_cf') for configuration files, ensuring compatibility with quoted substrings.
 
 	3. **parseCFile**: A recursive function to parse configuration files, supporting 'include' directives and cyclic include detection. It populates the `OrderedNamespace` with parsed arguments.
 
@@ -4245,71 +4587,68 @@ if __name__ == "__main__":
 	"""		
 	# define an argparse.Namespace that remembers the order in which attributes are added
 	class OrderedNamespace(argparse.Namespace):
+		def __init__(self, **kwargs):
+			# set up the order record directly, so that __setattr__ never has to check for it
+			self.__dict__['__OrderedDict'] = collections.OrderedDict()
+			super(OrderedNamespace,self).__init__(**kwargs)
+		
 		def __setattr__(self, name, value):
-			if name != '__OrderedDict':
-				if '__OrderedDict' not in self.__dict__:
-					self.__dict__['__OrderedDict'] = collections.OrderedDict()
-				self.__dict__['__OrderedDict'][name] = None
-			super(OrderedNamespace,self).__setattr__(name, value)
+			self.__dict__['__OrderedDict'][name] = None
+			object.__setattr__(self, name, value)
 		
 		def __delattr__(self, name):
-			if name != '__OrderedDict':
-				if '__OrderedDict' in self.__dict__:
-					del self.__dict__['__OrderedDict'][name]
-			super(OrderedNamespace,self).__delattr__(name)
+			del self.__dict__['__OrderedDict'][name]
+			object.__delattr__(self, name)
 		
 		def __iter__(self):
-			return (self.__dict__['__OrderedDict'] or []).__iter__()
+			return iter(self.__dict__['__OrderedDict'])
 	#OrderedNamespace
 	
-	# define a CSV dialect for conf files (to support "quoted substrings")
-	class cfDialect(csv.Dialect):
-		delimiter = ' '
-		doublequote = False
-		escapechar = '\\'
-		lineterminator = '\n'
-		quotechar = '"'
-		quoting = csv.QUOTE_MINIMAL
-		skipinitialspace = True
-	#cfDialect
-	
 	# define a recursive function to parse conf files (to support 'include')
 	options = parser.parse_args(args=[], namespace=OrderedNamespace())
 	cfStack = list()
+	cfStackSet = set()
+	cfAbsPath = functools.lru_cache(maxsize=None)(os.path.abspath)
 	def parseCFile(cfName):
 		# check for cycles
-		cfAbs = ('<stdin>' if cfName == '-' else os.path.abspath(cfName))
-		if cfAbs in cfStack:
+		cfAbs = ('<stdin>' if cfName == '-' else cfAbsPath(cfName))
+		if cfAbs in cfStackSet:
 			sys.exit("ERROR: configuration files include eachother in a loop! %s" % (' -> '.join(cfStack + [cfAbs])))
 		cfStack.append(cfAbs)
+		cfStackSet.add(cfAbs)
 		
-		# set up iterators
-		cfHandle = (sys.stdin if cfName == '-' else open(cfName,'r'))
-		cfStream = (line.replace('\t',' ').strip() for line in cfHandle)
-		cfLines = (line for line in cfStream if line and not line.startswith('#'))
-		cfReader = csv.reader(cfLines, dialect=cfDialect)
-		
-		# parse the file; recurse for includes, store the rest
-		cfArgs = list()
-		for line in cfReader:
-			line[0] = '--' + line[0].lower().replace('_','-')
+		# set up a line reader; files are simply re-read for each pass, but stdin can only be read once
+		cfBuffer = (list(sys.stdin) if cfName == '-' else None)
+		def cfReader():
+			cfHandle = (cfBuffer if cfBuffer != None else open(cfName,'r'))
+			try:
+				for line in csv.reader(_configFileLines(cfHandle), dialect='biofilter_cf'):
+					line[0] = '--' + line[0].lower().replace('_','-')
+					yield line
+			finally:
+				if cfBuffer == None:
+					cfHandle.close()
+		#cfReader()
+		
+		# included files are processed in full first, so this file's own options override theirs
+		for line in cfReader():
 			if line[0] == '--include':
 				for l in range(1,len(line)):
 					parseCFile(line[l])
-			else:
-				cfArgs.extend(line)
-				cfArgs.append('--end-of-line')
 		#foreach line
 		
-		# close the stream and try to parse the args
-		if cfHandle != sys.stdin:
-			cfHandle.close()
+		# then parse the rest of the file one line at a time, rather than collecting every token first
 		try:
-			parser.parse_args(args=cfArgs, namespace=options)
-			# if extra arguments are given to an otherwise correct option,
-			# they'll end up in 'configuration' because it accepts nargs=*
-			if options.configuration:
-				raise Exception("unexpected argument(s): %s" % (' '.join(options.configuration)))
+			for line in cfReader():
+				if line[0] != '--include':
+					# each line is parsed on its own, so no end-of-line marker is needed to
+					# stop one line's nargs='+' option from consuming the next line's arguments
+					parser.parse_args(args=line, namespace=options)
+					# if extra arguments are given to an otherwise correct option,
+					# they'll end up in 'configuration' because it accepts nargs=*
+					if options.configuration:
+						raise Exception("unexpected argument(s): %s" % (' '.join(options.configuration)))
+			#foreach line
 		except:
 			print ("(in configuration file '%s')" % cfName)
 			raise
@@ -4317,26 +4656,40 @@ if __name__ == "__main__":
 		# pop the stack and return
 		assert(cfStack[-1] == cfAbs)
 		cfStack.pop()
+		cfStackSet.discard(cfAbs)
 	#parseCFile()
 	
 	# parse the command line for any configuration files, then re-parse to override them
 	for cfName in (parser.parse_args()).configuration:
 		parseCFile(cfName)
 	parser.parse_args(namespace=options)
-	bio = Biofilter(options)
 	empty = list()
 	
+	# resolve the yes/no flags which the output setup consults for every output;
+	# the options themselves keep their 'yes'/'no' values for Biofilter and the configuration report
+	toStdout = (options.stdout == 'yes')
+	overwrite = (options.overwrite == 'yes')
+	debugLogic = bool(options.debug_logic) # store_true, so this is already a bool (never 'yes')
+	
+	# all outputs are written as encoded bytes, so --stdout goes to the binary layer underneath sys.stdout
+	stdoutBytes = getattr(sys.stdout, 'buffer', sys.stdout)
+	
+	# Biofilter (with its log file and temp schema) is not started until all of the
+	# output paths have been validated; queue any warnings issued in the meantime
+	pendingWarnings = list()
+	
 	# identify all the reports we need to output
+	prefixDot = options.prefix + '.'
 	typeOutputPath = collections.OrderedDict()
 	typeOutputPath['report'] = collections.OrderedDict()
 	if options.report_configuration == 'yes':
-		typeOutputPath['report']['configuration'] = options.prefix + '.configuration'
+		typeOutputPath['report']['configuration'] = prefixDot + 'configuration'
 	if options.report_gene_name_stats == 'yes':
-		typeOutputPath['report']['gene name statistics'] = options.prefix + '.gene-names'
+		typeOutputPath['report']['gene name statistics'] = prefixDot + 'gene-names'
 	if options.report_group_name_stats == 'yes':
-		typeOutputPath['report']['group name statistics'] = options.prefix + '.group-names'
+		typeOutputPath['report']['group name statistics'] = prefixDot + 'group-names'
 	if options.report_ld_profiles == 'yes':
-		typeOutputPath['report']['LD profiles'] = options.prefix + '.ld-profiles'
+		typeOutputPath['report']['LD profiles'] = prefixDot + 'ld-profiles'
 	
 	# define invalid input handlers, if requested
 	typeOutputPath['invalid'] = collections.OrderedDict()
@@ -4344,20 +4697,17 @@ if __name__ == "__main__":
 	cbLog = collections.OrderedDict()
 	cbMake = lambda modtype: lambda line,err: cbLog[modtype].extend(["# %s" % (err or "(unknown error"), str(line).rstrip()])
 	if options.report_invalid_input == 'yes':
-		for itype in ['SNP','position','region','gene','group','source']:
-			for mod in ['','alt-']:
-				typeOutputPath['invalid'][mod+itype] = options.prefix + '.invalid.' + mod+itype.lower()
-				cbLog[mod+itype] = list()
-		for itype in ['userknowledge']:
-			typeOutputPath['invalid'][itype] = options.prefix + '.invalid.' + itype.lower()
-			cbLog[itype] = list()
+		itypes = [mod+itype for itype,mod in itertools.product(['SNP','position','region','gene','group','source'], ['','alt-'])]
+		itypes.append('userknowledge')
+		typeOutputPath['invalid'].update((itype, prefixDot + 'invalid.' + itype.lower()) for itype in itypes)
+		cbLog.update((itype, list()) for itype in itypes)
 	#if report invalid input
 	
 	# identify all the filtering results we need to output
 	typeOutputPath['filter'] = collections.OrderedDict()
 	for types in (options.filter or empty):
 		if types:
-			typeOutputPath['filter'][tuple(types)] = options.prefix + '.' + '-'.join(types)
+			typeOutputPath['filter'][tuple(types)] = prefixDot + '-'.join(types)
 		else:
 			# ignore empty filters
 			pass
@@ -4393,10 +4743,10 @@ if __name__ == "__main__":
 			typesA = types[1:None]
 
 		if typesF and typesA:
-			typeOutputPath['annotation'][(tuple(typesF),tuple(typesA))] = options.prefix + '.' + '-'.join(typesF[1:]) + '.' + '-'.join(typesA)
+			typeOutputPath['annotation'][(tuple(typesF),tuple(typesA))] = '%s%s.%s' % (prefixDot, '-'.join(typesF[1:]), '-'.join(typesA))
 		elif typesF:
-			bio.warn("WARNING: annotating '%s' is equivalent to filtering '%s'\n" % (' '.join(types),' '.join(typesF)))
-			typeOutputPath['filter'][tuple(typesF)] = options.prefix + '.' + '-'.join(typesF)
+			pendingWarnings.append("WARNING: annotating '%s' is equivalent to filtering '%s'\n" % (' '.join(types),' '.join(typesF)))
+			typeOutputPath['filter'][tuple(typesF)] = prefixDot + '-'.join(typesF)
 		elif typesA:
 			sys.exit("ERROR: cannot annotate '%s' with no starting point\n" % (' '.join(types),))
 		else:
@@ -4423,69 +4773,89 @@ if __name__ == "__main__":
 		elif not (typesL and typesR):
 			sys.exit("ERROR: cannot model '%s', both sides require at least one output type\n" % ' '.join(types))
 		elif typesL == typesR:
-			typeOutputPath['models'][(tuple(typesL),tuple(typesR))] = options.prefix + '.' + '-'.join(typesL) + '.models'
+			typeOutputPath['models'][(tuple(typesL),tuple(typesR))] = '%s%s.models' % (prefixDot, '-'.join(typesL))
 		else:
-			typeOutputPath['models'][(tuple(typesL),tuple(typesR))] = options.prefix + '.' + '-'.join(typesL) + '.' + '-'.join(typesR) + '.models'
+			typeOutputPath['models'][(tuple(typesL),tuple(typesR))] = '%s%s.%s.models' % (prefixDot, '-'.join(typesL), '-'.join(typesR))
 	#foreach requested model
 	
 	# identify all the PARIS result files we need to output
 	typeOutputPath['paris'] = collections.OrderedDict()
 	if options.paris == 'yes':
-		typeOutputPath['paris']['summary'] = options.prefix + '.paris-summary'
+		typeOutputPath['paris']['summary'] = prefixDot + 'paris-summary'
 		if options.paris_details == 'yes':
-			typeOutputPath['paris']['detail'] = options.prefix + '.paris-detail'
+			typeOutputPath['paris']['detail'] = prefixDot + 'paris-detail'
+	
+	# list the prefix directory once, rather than stat()ing every output path separately;
+	# names are casefolded so that a miss is reliable on case-insensitive filesystems too,
+	# and a hit is confirmed with os.path.exists() (which also drops broken symlinks);
+	# if the directory can't be listed, fall back to checking each path individually
+	outputDir = os.path.dirname(options.prefix)
+	outputExisting = set()
+	if not toStdout:
+		try:
+			outputExisting = set(e.name.casefold() for e in os.scandir(outputDir or '.'))
+		except FileNotFoundError:
+			pass
+		except OSError:
+			outputExisting = None
 	
 	# verify that all output files are unique, writeable and nonexistant (unless overwriting)
 	typeOutputInfo = dict()
 	pathUsed = dict()
+	outputLabel = {
+		'report'     : lambda output: "%s report" % (output,),
+		'invalid'    : lambda output: "invalid %s input report" % (output,),
+		'filter'     : lambda output: "'%s' filter" % (" ".join(output),),
+		'annotation' : lambda output: "'%s : %s' annotation" % (" ".join(output[0][1:])," ".join(output[1])),
+		'models'     : lambda output: (("'%s' models" % (" ".join(output[0]),)) if (output[0] == output[1]) else ("'%s : %s' models" % (" ".join(output[0])," ".join(output[1])))),
+		'paris'      : lambda output: "PARIS %s report" % (output,),
+	}
 	for outtype,outputPath in typeOutputPath.items():
 		typeOutputInfo[outtype] = collections.OrderedDict()
+		if outtype not in outputLabel:
+			raise Exception("unexpected output type")
+		makeLabel = outputLabel[outtype]
 		for output,path in outputPath.items():
-			if outtype == 'report':
-				label = "%s report" % (output,)
-			elif outtype == 'invalid':
-				label = "invalid %s input report" % (output,)
-			elif outtype == 'filter':
-				label = "'%s' filter" % (" ".join(output),)
-			elif outtype == 'annotation':
-				label = "'%s : %s' annotation" % (" ".join(output[0][1:])," ".join(output[1]))
-			elif outtype == 'models':
-				if output[0] == output[1]:
-					label = "'%s' models" % (" ".join(output[0]),)
-				else:
-					label = "'%s : %s' models" % (" ".join(output[0])," ".join(output[1]))
-			elif outtype == 'paris':
-				label = "PARIS %s report" % (output,)
-			else:
-				raise Exception("unexpected output type")
+			label = makeLabel(output)
 			
-			if options.debug_logic == 'yes':
-				bio.warn("%s will be written to '%s'\n" % (label,('<stdout>' if options.stdout == 'yes' else path)))
+			if debugLogic:
+				pendingWarnings.append("%s will be written to '%s'\n" % (label,('<stdout>' if toStdout else path)))
 			
-			if options.stdout == 'yes':
+			if toStdout:
 				path = '<stdout>'
 			elif path in pathUsed:
 				sys.exit("ERROR: cannot write %s to '%s', file is already reserved for %s\n" % (label,path,pathUsed[path]))
-			elif os.path.exists(path):
-				if options.overwrite == 'yes':
-					bio.warn("WARNING: %s file '%s' already exists and will be overwritten\n" % (label,path))
+			elif ((outputExisting == None) or (os.path.dirname(path) != outputDir) or (os.path.basename(path).casefold() in outputExisting)) and os.path.exists(path):
+				if overwrite:
+					pendingWarnings.append("WARNING: %s file '%s' already exists and will be overwritten\n" % (label,path))
 				else:
 					sys.exit("ERROR: %s file '%s' already exists, must specify --overwrite or a different --prefix\n" % (label,path))
 			pathUsed[path] = label
-			file = sys.stdout if options.stdout == 'yes' else (open(path,'wb') if outtype != 'invalid' else None)
-			typeOutputInfo[outtype][output] = (label,path,file)
+			typeOutputInfo[outtype][output] = (label,path,None)
 			if outtype == 'invalid':
 				cb[output] = cbMake(output)
 		#foreach output of type
 	#foreach output type
 	
+	# all outputs are valid, so start up Biofilter and set up the output files (each opened on first write)
+	bio = Biofilter(options)
+	for message in pendingWarnings:
+		bio.warn(message)
+	for outtype,outputInfo in typeOutputInfo.items():
+		for output,(label,path,file) in outputInfo.items():
+			file = stdoutBytes if toStdout else (_LazyFile(path,'wb') if outtype != 'invalid' else None)
+			outputInfo[output] = (label,path,file)
+		#foreach output of type
+	#foreach output type
+	
 	# attach the knowledge file, if provided
 	if options.knowledge:
 		dbPath = options.knowledge
 		if not os.path.exists(dbPath):
 			cwdDir = os.path.dirname(os.path.realpath(os.path.abspath(os.getcwd())))
 			myDir = os.path.dirname(os.path.realpath(os.path.abspath(__file__)))
-			if not os.path.samefile(cwdDir, myDir):
+			# both paths are already resolved, so equal strings are the same directory without stat()ing either
+			if (cwdDir != myDir) and not os.path.samefile(cwdDir, myDir):
 				dbPath = os.path.join(myDir, options.knowledge)
 				if not os.path.exists(dbPath):
 					sys.exit("ERROR: knowledge database file '%s' not found in '%s' or '%s'" % (options.knowledge, cwdDir, myDir))
@@ -4508,35 +4878,38 @@ if __name__ == "__main__":
 		sourceVerify[source][2][file] = (date,int(size),md5)
 	if sourceVerify or options.verify_biofilter_version or options.verify_loki_version:
 		bio.logPush("verifying replication fingerprint ...\n")
-		if options.verify_biofilter_version and (options.verify_biofilter_version != Biofilter.getVersionString()):
-			sys.exit("ERROR: configuration requires Biofilter version %s, but this is version %s\n" % (options.verify_biofilter_version, Biofilter.getVersionString()))
-		if options.verify_loki_version and (options.verify_loki_version != loki_db.Database.getVersionString()):
-			sys.exit("ERROR: configuration requires LOKI version %s, but this is version %s\n" % (options.verify_loki_version, loki_db.Database.getVersionString()))
-		for source in sorted(sourceVerify):
-			verify = sourceVerify[source]
-			sourceID = bio._loki.getSourceID(source)
-			if not sourceID:
+		if options.verify_biofilter_version and (options.verify_biofilter_version != bioVersion):
+			sys.exit("ERROR: configuration requires Biofilter version %s, but this is version %s\n" % (options.verify_biofilter_version, bioVersion))
+		if options.verify_loki_version and (options.verify_loki_version != lokiVersion):
+			sys.exit("ERROR: configuration requires LOKI version %s, but this is version %s\n" % (options.verify_loki_version, lokiVersion))
+		# fetch every source's fingerprint together (source names are stored in lowercase);
+		# Biofilter keeps them, so a configuration report later in the run reuses the same data
+		fingerprints = (bio.getSourceFingerprints() if sourceVerify else dict())
+		for source,(verVersion,verOptions,verFiles) in sorted(sourceVerify.items()):
+			fingerprint = fingerprints.get(source.lower())
+			if not fingerprint:
 				sys.exit("ERROR: cannot verify %s fingerprint, knowledge database contains no such source\n" % (source,))
-			version = bio._loki.getSourceIDVersion(sourceID)
-			if verify[0] and verify[0] != version:
-				sys.exit("ERROR: configuration requires %s loader version %s, but knowledge database reports version %s\n" % (source,verify[0],version))
-			if verify[1]:
-				options = bio._loki.getSourceIDOptions(sourceID)
-				for opt,val in verify[1].items():
-					if opt not in options or val != options[opt]:
-						sys.exit("ERROR: configuration requires %s loader option %s = %s, but knowledge database reports setting = %s\n" % (source,opt,val,options.get(opt)))
-			if verify[2]:
-				files = bio._loki.getSourceIDFiles(sourceID)
-				for file,meta in verify[2].items():
-					if file not in files:
+			version,dbOptions,dbFiles = fingerprint
+			if verVersion and verVersion != version:
+				sys.exit("ERROR: configuration requires %s loader version %s, but knowledge database reports version %s\n" % (source,verVersion,version))
+			if verOptions:
+				for opt,val in verOptions.items():
+					# val is always a string, so a missing option (None) can never match
+					dbVal = dbOptions.get(opt)
+					if val != dbVal:
+						sys.exit("ERROR: configuration requires %s loader option %s = %s, but knowledge database reports setting = %s\n" % (source,opt,val,dbVal))
+			if verFiles:
+				for file,meta in verFiles.items():
+					dbMeta = dbFiles.get(file)
+					if dbMeta == None:
 						sys.exit("ERROR: configuration requires a specific fingerprint for %s file '%s', but knowledge database reports no such file\n" % (source,file))
 					# size and hash should be sufficient comparisons, and some sources (KEGG,PharmGKB) don't provide data file timestamps anyway
-					#elif meta[0] != files[file][0]:
-					#	sys.exit("ERROR: configuration requires %s file '%s' modification date '%s', but knowledge database reports '%s'\n" % (source,file,meta[0],files[file][0]))
-					elif meta[1] != files[file][1]:
-						sys.exit("ERROR: configuration requires %s file '%s' size %s, but knowledge database reports %s\n" % (source,file,meta[1],files[file][1]))
-					elif meta[2] != files[file][2]:
-						sys.exit("ERROR: configuration requires %s file '%s' hash '%s', but knowledge database reports '%s'\n" % (source,file,meta[2],files[file][2]))
+					#elif meta[0] != dbMeta[0]:
+					#	sys.exit("ERROR: configuration requires %s file '%s' modification date '%s', but knowledge database reports '%s'\n" % (source,file,meta[0],dbMeta[0]))
+					elif meta[1] != dbMeta[1]:
+						sys.exit("ERROR: configuration requires %s file '%s' size %s, but knowledge database reports %s\n" % (source,file,meta[1],dbMeta[1]))
+					elif meta[2] != dbMeta[2]:
+						sys.exit("ERROR: configuration requires %s file '%s' hash '%s', but knowledge database reports '%s'\n" % (source,file,meta[2],dbMeta[2]))
 		#foreach source
 		bio.logPop("... OK\n")
 	#if verify replication fingerprint
@@ -4574,13 +4947,23 @@ if __name__ == "__main__":
 		bio.warn("user input genome build: GRCh%s / UCSC hg%s\n" % (grchBuildUser or '?', ucscBuildUser or '?'))
 	
 	# define output helper functions
-	utf8 = codecs.getencoder('utf8')
 	def encodeString(string):
-		return utf8(string)[0]
+		return string.encode('utf8')
 	def encodeLine(line, term="\n"):
-		return utf8("%s%s" % (line,term))[0]
+		return ("%s%s" % (line,term)).encode('utf8')
 	def encodeRow(row, term="\n", delim="\t"):
-		return utf8("%s%s" % ((delim.join((col if isinstance(col,str) else str('' if col == None else col)) for col in row)),term))[0]
+		# one join and one encode per row is cheaper than encoding each column separately
+		return (delim.join([(col if isinstance(col,str) else ('' if col == None else str(col))) for col in row]) + term).encode('utf8')
+	def writeRows(outfile, rows, chunkSize=1024):
+		# encode and write rows a chunk at a time, rather than with one write() call per row
+		n = 0
+		rows = iter(rows)
+		chunk = [encodeRow(row) for row in itertools.islice(rows, chunkSize)]
+		while chunk:
+			outfile.writelines(chunk)
+			n += len(chunk)
+			chunk = [encodeRow(row) for row in itertools.islice(rows, chunkSize)]
+		return n
 	
 	# process reports
 	for report,info in typeOutputInfo['report'].items():
@@ -4589,28 +4972,28 @@ if __name__ == "__main__":
 		if report == 'configuration':
 			outfile.write(encodeLine("# Biofilter configuration file"))
 			outfile.write(encodeLine("#   generated %s" % time.strftime('%a, %d %b %Y %H:%M:%S')))
-			outfile.write(encodeLine("#   Biofilter version %s" % Biofilter.getVersionString()))
-			outfile.write(encodeLine("#   LOKI version %s" % loki_db.Database.getVersionString()))
+			outfile.write(encodeLine("#   Biofilter version %s" % bioVersion))
+			outfile.write(encodeLine("#   LOKI version %s" % lokiVersion))
 			outfile.write(encodeLine(""))
 			if options.report_replication_fingerprint == 'yes':
-				outfile.write(encodeLine("%-35s \"%s\"" % ('VERIFY_BIOFILTER_VERSION', Biofilter.getVersionString(),)))
-				outfile.write(encodeLine("%-35s \"%s\"" % ('VERIFY_LOKI_VERSION', loki_db.Database.getVersionString(),)))
+				outfile.write(encodeLine("%s \"%s\"" % (_configOptionLabel('verify_biofilter_version'), bioVersion,)))
+				outfile.write(encodeLine("%s \"%s\"" % (_configOptionLabel('verify_loki_version'), lokiVersion,)))
 				for source,fingerprint in bio.getSourceFingerprints().items():
-					outfile.write(encodeLine("%-35s %s \"%s\"" % ('VERIFY_SOURCE_LOADER',source,fingerprint[0])))
+					outfile.write(encodeLine("%s %s \"%s\"" % (_configOptionLabel('verify_source_loader'),source,fingerprint[0])))
 					for srcopt in sorted(fingerprint[1]):
-						outfile.write(encodeLine("%-35s %s %s " % ('VERIFY_SOURCE_OPTION',source,srcopt), term=""))
+						outfile.write(encodeLine("%s %s %s " % (_configOptionLabel('verify_source_option'),source,srcopt), term=""))
 						outfile.write(encodeRow(fingerprint[1][srcopt], delim=" "))
 					for srcfile in sorted(fingerprint[2]):
-						outfile.write(encodeLine("%-35s %s \"%s\" " % ('VERIFY_SOURCE_FILE',source,srcfile), term=""))
+						outfile.write(encodeLine("%s %s \"%s\" " % (_configOptionLabel('verify_source_file'),source,srcfile), term=""))
 						outfile.write(encodeRow((('"%s"' % col) for col in fingerprint[2][srcfile]), delim=" "))
 					outfile.write(encodeLine(""))
 			for opt in options:
 				if opt in ('configuration','verify_source_loader','verify_source_option','verify_source_file') or not hasattr(options, opt):
 					continue
 				val = getattr(options, opt)
-				if type(val) == bool: # --end-of-line, --debug-*
+				if type(val) == bool: # --debug-*
 					continue
-				opt = "%-35s" % opt.upper().replace('-','_')
+				opt = _configOptionLabel(opt)
 				# three possibilities: simple value, list of simple values, or list of lists of simple values
 				if isinstance(val,list) and len(val) and isinstance(val[0],list):
 					for subvals in val:
@@ -4641,226 +5024,155 @@ if __name__ == "__main__":
 		else:
 			raise Exception("unexpected report type")
 		#which report
-		if outfile != sys.stdout:
+		if outfile != stdoutBytes:
 			outfile.close()
 		bio.logPop("... OK\n")
 	#foreach report
 	
+	# verify the LD profile before loading any input, rather than failing on the first query
+	if typeOutputInfo['filter'] or typeOutputInfo['annotation'] or typeOutputInfo['models'] or typeOutputInfo['paris']:
+		bio.getOptionLDProfileID()
+	
 	# load user-defined knowledge, if any
 	for path in (options.user_defined_knowledge or empty):
 		bio.loadUserKnowledgeFile(path, options.gene_identifier_type, errorCallback=cb['userknowledge'])
 	if options.user_defined_filter != 'no':
 		bio.applyUserKnowledgeFilter((options.user_defined_filter == 'group'))
 	
-	# apply primary filters
-	for snpList in (options.snp or empty):
-		bio.intersectInputSNPs(
-			'main',
-			bio.generateRSesFromText(snpList, separator=':', errorCallback=cb['SNP']),
-			errorCallback=cb['SNP']
-		)
-	for snpFileList in (options.snp_file or empty):
-		bio.intersectInputSNPs(
-			'main',
-			bio.generateRSesFromRSFiles(snpFileList, errorCallback=cb['SNP']),
-			errorCallback=cb['SNP']
-		)
-	for positionList in (options.position or empty):
-		bio.intersectInputLoci(
-			'main',
-			bio.generateLiftOverLoci(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateLociFromText(positionList, separator=':', applyOffset=True, errorCallback=cb['position']),
-				errorCallback=cb['position']
-			),
-			errorCallback=cb['position']
-		)
-	for positionFileList in (options.position_file or empty):
-		bio.intersectInputLoci(
-			'main',
-			bio.generateLiftOverLoci(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateLociFromMapFiles(positionFileList, applyOffset=True, errorCallback=cb['position']),
-				errorCallback=cb['position']
-			),
-			errorCallback=cb['position']
-		)
-	for geneList in (options.gene or empty):
-		bio.intersectInputGenes(
-			'main',
-			bio.generateNamesFromText(geneList, options.gene_identifier_type, separator=':', errorCallback=cb['gene']),
-			errorCallback=cb['gene']
-		)
-	for geneFileList in (options.gene_file or empty):
-		bio.intersectInputGenes(
-			'main',
-			bio.generateNamesFromNameFiles(geneFileList, options.gene_identifier_type, errorCallback=cb['gene']),
-			errorCallback=cb['gene']
-		)
-	for geneSearch in (options.gene_search or empty):
-		bio.intersectInputGeneSearch(
-			'main',
-			(2*(encodeString(s),) for s in geneSearch)
-		)
-	for regionList in (options.region or empty):
-		bio.intersectInputRegions(
-			'main',
-			bio.generateLiftOverRegions(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateRegionsFromText(regionList, separator=':', applyOffset=True, errorCallback=cb['region']),
-				errorCallback=cb['region']
-			),
-			errorCallback=cb['region']
-		)
-	for regionFileList in (options.region_file or empty):
-		bio.intersectInputRegions(
-			'main',
-			bio.generateLiftOverRegions(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateRegionsFromFiles(regionFileList, applyOffset=True, errorCallback=cb['region']),
-				errorCallback=cb['region']
-			),
-			errorCallback=cb['region']
-		)
-	for groupList in (options.group or empty):
-		bio.intersectInputGroups(
-			'main',
-			bio.generateNamesFromText(groupList, options.group_identifier_type, separator=':', errorCallback=cb['group']),
-			errorCallback=cb['group']
-		)
-	for groupFileList in (options.group_file or empty):
-		bio.intersectInputGroups(
-			'main',
-			bio.generateNamesFromNameFiles(groupFileList, options.group_identifier_type, errorCallback=cb['group']),
-			errorCallback=cb['group']
-		)
-	for groupSearch in (options.group_search or empty):
-		bio.intersectInputGroupSearch(
-			'main',
-			(2*(encodeString(s),) for s in groupSearch)
-		)
-	for sourceList in (options.source or empty):
-		bio.intersectInputSources(
-			'main',
-			sourceList,
-			errorCallback=cb['source']
-		)
-	for sourceFile in itertools.chain(*(options.source_file or empty)):
-		bio.intersectInputSources(
-			'main',
-			itertools.chain(*(line for line in open(sourceFile,'r'))),
-			errorCallback=cb['source']
-		)
-	
-	# apply alternate filters
-	for snpList in (options.alt_snp or empty):
-		bio.intersectInputSNPs(
-			'alt',
-			bio.generateRSesFromText(snpList, separator=':', errorCallback=cb['alt-SNP']),
-			errorCallback=cb['alt-SNP']
-		)
-	for snpFileList in (options.alt_snp_file or empty):
-		bio.intersectInputSNPs(
-			'alt',
-			bio.generateRSesFromRSFiles(snpFileList, errorCallback=cb['alt-SNP']),
-			errorCallback=cb['alt-SNP']
-		)
-	for positionList in (options.alt_position or empty):
-		bio.intersectInputLoci(
-			'alt',
-			bio.generateLiftOverLoci(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateLociFromText(positionList, separator=':', applyOffset=True, errorCallback=cb['alt-position']),
-				errorCallback=cb['alt-position']),
-			errorCallback=cb['alt-position']
-		)
-	for positionFileList in (options.alt_position_file or empty):
-		bio.intersectInputLoci(
-			'alt',
-			bio.generateLiftOverLoci(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateLociFromMapFiles(positionFileList, applyOffset=True, errorCallback=cb['alt-position']),
-				errorCallback=cb['alt-position']
-			),
-			errorCallback=cb['alt-position']
-		)
-	for geneList in (options.alt_gene or empty):
-		bio.intersectInputGenes(
-			'alt',
-			bio.generateNamesFromText(geneList, options.gene_identifier_type, separator=':', errorCallback=cb['alt-gene']),
-			errorCallback=cb['alt-gene']
-		)
-	for geneFileList in (options.alt_gene_file or empty):
-		bio.intersectInputGenes(
-			'alt',
-			bio.generateNamesFromNameFiles(geneFileList, options.gene_identifier_type, errorCallback=cb['alt-gene']),
-			errorCallback=cb['alt-gene']
-		)
-	for geneSearch in (options.alt_gene_search or empty):
-		bio.intersectInputGeneSearch(
-			'alt',
-			(2*(encodeString(s),) for s in geneSearch)
-		)
-	for regionList in (options.alt_region or empty):
-		bio.intersectInputRegions(
-			'alt',
-			bio.generateLiftOverRegions(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateRegionsFromText(regionList, separator=':', applyOffset=True, errorCallback=cb['alt-region']),
-				errorCallback=cb['alt-region']
-			),
-			errorCallback=cb['alt-region']
-		)
-	for regionFileList in (options.alt_region_file or empty):
-		bio.intersectInputRegions(
-			'alt',
-			bio.generateLiftOverRegions(
-				ucscBuildUser, ucscBuildDB,
-				bio.generateRegionsFromFiles(regionFileList, applyOffset=True, errorCallback=cb['alt-region']),
-				errorCallback=cb['alt-region']
-			),
-			errorCallback=cb['alt-region']
-		)
-	for groupList in (options.alt_group or empty):
-		bio.intersectInputGroups(
-			'alt',
-			bio.generateNamesFromText(groupList, options.group_identifier_type, separator=':', errorCallback=cb['alt-group']),
-			errorCallback=cb['alt-group']
-		)
-	for groupFileList in (options.alt_group_file or empty):
-		bio.intersectInputGroups(
-			'alt',
-			bio.generateNamesFromNameFiles(groupFileList, options.group_identifier_type, errorCallback=cb['alt-group']),
-			errorCallback=cb['alt-group']
-		)
-	for groupSearch in (options.alt_group_search or empty):
-		bio.intersectInputGroupSearch(
-			'alt',
-			(2*(encodeString(s),) for s in groupSearch)
-		)
-	for sourceList in (options.alt_source or empty):
-		bio.intersectInputSources(
-			'alt',
-			sourceList,
-			errorCallback=cb['alt-source']
-		)
-	for sourceFile in itertools.chain(*(options.alt_source_file or empty)):
-		bio.intersectInputSources(
-			'alt',
-			itertools.chain(*(line for line in open(sourceFile,'r'))),
-			errorCallback=cb['alt-source']
-		)
+	# bind the filter and generator methods once for all of the input dispatch below
+	intersectInputSNPs = bio.intersectInputSNPs
+	intersectInputLoci = bio.intersectInputLoci
+	intersectInputGenes = bio.intersectInputGenes
+	intersectInputGeneSearch = bio.intersectInputGeneSearch
+	intersectInputRegions = bio.intersectInputRegions
+	intersectInputGroups = bio.intersectInputGroups
+	intersectInputGroupSearch = bio.intersectInputGroupSearch
+	intersectInputSources = bio.intersectInputSources
+	generateRSesFromText = bio.generateRSesFromText
+	generateRSesFromRSFiles = bio.generateRSesFromRSFiles
+	generateLociFromText = bio.generateLociFromText
+	generateLociFromMapFiles = bio.generateLociFromMapFiles
+	generateLiftOverLoci = bio.generateLiftOverLoci
+	generateNamesFromText = bio.generateNamesFromText
+	generateNamesFromNameFiles = bio.generateNamesFromNameFiles
+	generateRegionsFromText = bio.generateRegionsFromText
+	generateRegionsFromFiles = bio.generateRegionsFromFiles
+	generateLiftOverRegions = bio.generateLiftOverRegions
+	
+	# apply primary and then alternate filters, which differ only by database, option names and error report
+	for db,mod in (('main',''),('alt','alt-')):
+		opt = mod.replace('-','_')
+		for snpList in (getattr(options, opt+'snp') or empty):
+			intersectInputSNPs(
+				db,
+				generateRSesFromText(snpList, separator=':', errorCallback=cb[mod+'SNP']),
+				errorCallback=cb[mod+'SNP']
+			)
+		for snpFileList in (getattr(options, opt+'snp_file') or empty):
+			intersectInputSNPs(
+				db,
+				generateRSesFromRSFiles(snpFileList, errorCallback=cb[mod+'SNP']),
+				errorCallback=cb[mod+'SNP']
+			)
+		for positionList in (getattr(options, opt+'position') or empty):
+			intersectInputLoci(
+				db,
+				generateLiftOverLoci(
+					ucscBuildUser, ucscBuildDB,
+					generateLociFromText(positionList, separator=':', applyOffset=True, errorCallback=cb[mod+'position']),
+					errorCallback=cb[mod+'position']
+				),
+				errorCallback=cb[mod+'position']
+			)
+		for positionFileList in (getattr(options, opt+'position_file') or empty):
+			intersectInputLoci(
+				db,
+				generateLiftOverLoci(
+					ucscBuildUser, ucscBuildDB,
+					generateLociFromMapFiles(positionFileList, applyOffset=True, errorCallback=cb[mod+'position']),
+					errorCallback=cb[mod+'position']
+				),
+				errorCallback=cb[mod+'position']
+			)
+		for geneList in (getattr(options, opt+'gene') or empty):
+			intersectInputGenes(
+				db,
+				generateNamesFromText(geneList, options.gene_identifier_type, separator=':', errorCallback=cb[mod+'gene']),
+				errorCallback=cb[mod+'gene']
+			)
+		for geneFileList in (getattr(options, opt+'gene_file') or empty):
+			intersectInputGenes(
+				db,
+				generateNamesFromNameFiles(geneFileList, options.gene_identifier_type, errorCallback=cb[mod+'gene']),
+				errorCallback=cb[mod+'gene']
+			)
+		for geneSearch in (getattr(options, opt+'gene_search') or empty):
+			intersectInputGeneSearch(
+				db,
+				(2*(encodeString(s),) for s in geneSearch)
+			)
+		for regionList in (getattr(options, opt+'region') or empty):
+			intersectInputRegions(
+				db,
+				generateLiftOverRegions(
+					ucscBuildUser, ucscBuildDB,
+					generateRegionsFromText(regionList, separator=':', applyOffset=True, errorCallback=cb[mod+'region']),
+					errorCallback=cb[mod+'region']
+				),
+				errorCallback=cb[mod+'region']
+			)
+		for regionFileList in (getattr(options, opt+'region_file') or empty):
+			intersectInputRegions(
+				db,
+				generateLiftOverRegions(
+					ucscBuildUser, ucscBuildDB,
+					generateRegionsFromFiles(regionFileList, applyOffset=True, errorCallback=cb[mod+'region']),
+					errorCallback=cb[mod+'region']
+				),
+				errorCallback=cb[mod+'region']
+			)
+		for groupList in (getattr(options, opt+'group') or empty):
+			intersectInputGroups(
+				db,
+				generateNamesFromText(groupList, options.group_identifier_type, separator=':', errorCallback=cb[mod+'group']),
+				errorCallback=cb[mod+'group']
+			)
+		for groupFileList in (getattr(options, opt+'group_file') or empty):
+			intersectInputGroups(
+				db,
+				generateNamesFromNameFiles(groupFileList, options.group_identifier_type, errorCallback=cb[mod+'group']),
+				errorCallback=cb[mod+'group']
+			)
+		for groupSearch in (getattr(options, opt+'group_search') or empty):
+			intersectInputGroupSearch(
+				db,
+				(2*(encodeString(s),) for s in groupSearch)
+			)
+		for sourceList in (getattr(options, opt+'source') or empty):
+			intersectInputSources(
+				db,
+				sourceList,
+				errorCallback=cb[mod+'source']
+			)
+		for sourceFile in itertools.chain(*(getattr(options, opt+'source_file') or empty)):
+			# source files list one name per line
+			with open(sourceFile,'r') as sourceHandle:
+				intersectInputSources(
+					db,
+					(line.strip() for line in sourceHandle if line.strip()),
+					errorCallback=cb[mod+'source']
+				)
+	#foreach filter database
 	
 	# report invalid input, if requested
 	if options.report_invalid_input == 'yes':
 		for modtype,lines in cbLog.items():
 			if lines:
-				path = ('<stdout>' if options.stdout == 'yes' else typeOutputInfo['invalid'][modtype][1])
+				path = ('<stdout>' if toStdout else typeOutputInfo['invalid'][modtype][1])
 				bio.logPush("writing invalid %s input report to '%s' ...\n" % (modtype,path))
-				outfile = (sys.stdout if options.stdout == 'yes' else open(path, 'w'))
-				outfile.write("\n".join(lines))
-				outfile.write("\n")
-				if outfile != sys.stdout:
+				outfile = (stdoutBytes if toStdout else open(path, 'wb'))
+				outfile.write(encodeLine("\n".join(lines)))
+				if outfile != stdoutBytes:
 					outfile.close()
 				bio.logPop("... OK: %d invalid inputs\n" % (len(lines)/2))
 		#foreach modifier/type
@@ -4870,11 +5182,8 @@ if __name__ == "__main__":
 	for types,info in typeOutputInfo['filter'].items():
 		label,path,outfile = info
 		bio.logPush("writing %s to '%s' ...\n" % (label,path))
-		n = -1 # don't count header
-		for row in bio.generateFilterOutput(types, applyOffset=True):
-			n += 1
-			outfile.write(encodeRow(row))
-		if outfile != sys.stdout:
+		n = writeRows(outfile, bio.generateFilterOutput(types, applyOffset=True)) - 1 # don't count header
+		if outfile != stdoutBytes:
 			outfile.close()
 		bio.logPop("... OK: %d results\n" % n)
 	#foreach filter
@@ -4884,11 +5193,8 @@ if __name__ == "__main__":
 		typesF,typesA = types
 		label,path,outfile = info
 		bio.logPush("writing %s to '%s' ...\n" % (label,path))
-		n = -1 # don't count header
-		for row in bio.generateAnnotationOutput(typesF, typesA, applyOffset=True):
-			n += 1
-			outfile.write(encodeRow(row))
-		if outfile != sys.stdout:
+		n = writeRows(outfile, bio.generateAnnotationOutput(typesF, typesA, applyOffset=True)) - 1 # don't count header
+		if outfile != stdoutBytes:
 			outfile.close()
 		bio.logPop("... OK: %d results\n" % n)
 	#foreach annotation
@@ -4898,11 +5204,8 @@ if __name__ == "__main__":
 		typesL,typesR = types
 		label,path,outfile = info
 		bio.logPush("writing %s to '%s' ...\n" % (label,path))
-		n = -1 # don't count header
-		for row in bio.generateModelOutput(typesL, typesR, applyOffset=True):
-			n += 1
-			outfile.write(encodeRow(row))
-		if outfile != sys.stdout:
+		n = writeRows(outfile, bio.generateModelOutput(typesL, typesR, applyOffset=True)) - 1 # don't count header
+		if outfile != stdoutBytes:
 			outfile.close()
 		bio.logPop("... OK: %d results\n" % n)
 	#foreach model
@@ -4923,16 +5226,29 @@ if __name__ == "__main__":
 		if outfileD:
 			outfileD.write(encodeRow(header[0:2] + header[-1]))
 		n = 0
+		chunkS = list()
+		chunkD = (chunkS if (outfileD is outfileS) else list()) # keep --stdout rows interleaved as before
 		for row in parisGen:
 			n += 1
-			outfileS.write(encodeRow(row[:-1]))
+			chunkS.append(encodeRow(row[:-1]))
 			if outfileD:
-				outfileD.write(encodeRow(row[0:2] + ('*',) + row[4:-1]))
-				for rowD in row[-1]:
-					outfileD.write(encodeRow(row[0:2] + rowD))
-		if outfileS != sys.stdout:
+				# the leading two columns are shared by all of this row's detail lines, so encode them once
+				prefixD = encodeRow(row[0:2], term="\t")
+				chunkD.append(prefixD + encodeRow(('*',) + row[4:-1]))
+				chunkD.extend((prefixD + encodeRow(rowD)) for rowD in row[-1])
+			if len(chunkS) >= 1024:
+				outfileS.writelines(chunkS)
+				del chunkS[:]
+				if outfileD:
+					outfileD.writelines(chunkD)
+					del chunkD[:]
+		outfileS.writelines(chunkS)
+		del chunkS[:]
+		if outfileD:
+			outfileD.writelines(chunkD)
+		if outfileS != stdoutBytes:
 			outfileS.close()
-		if outfileD and (outfileD != sys.stdout):
+		if outfileD and (outfileD != stdoutBytes):
 			outfileD.close()
 		bio.logPop("... OK: %d results\n" % n)
 	#if PARIS
@@ -49,45 +49,54 @@ class Source_disgenet(loki_source.Source):
                 gunzip('disgenet_2020.db.gz')
                 diseases = {}
                 diseaseClass = {}
-                con = apsw.Connection('disgenet_2020.db')
+                # the downloaded file is only read, and LOKI's own writes already run inside the updater's savepoint
+                con = apsw.Connection('disgenet_2020.db', flags=apsw.SQLITE_OPEN_READONLY)
                 cur = con.cursor()
                 comm = 'select diseaseClassNID,diseaseClassName from diseaseClass'
-                cur.execute(comm)
-                diseaseClass = {diseaseclass[0]:diseaseclass[1].strip() for diseaseclass in cur.fetchall()}
+                diseaseClass = {classNID:className.strip() for classNID,className in cur.execute(comm)}
                 comm = 'SELECT a.diseaseId,a.diseaseName,b.diseaseClassNID FROM diseaseAttributes a LEFT JOIN disease2class b ON a.diseaseNID=b.diseaseNID order by a.diseaseNID'
-                cur.execute(comm)
-                diseases = {disease[0]:[disease[1],disease[2]] for disease in cur.fetchall()}
+                diseases = {diseaseID:(diseaseName,classNID) for diseaseID,diseaseName,classNID in cur.execute(comm)}
 		#foreach line in diseaseFile
                 self.log(" OK: %d disease\n" % (len(diseases),))
                 
                 # store diseases
                 self.log("writing diseases to the database ...")
                 listSubtype = self.addSubtypes([(val,)for val in set(diseaseClass.values())])
-                listGroup = diseases.keys()
-                listAID = self.addTypedGroups(typeID['disease'], ((subtypeID['-'] if diseases[diseaseID][1] is None else listSubtype[diseaseClass[diseases[diseaseID][1]]],diseases[diseaseID][0],None) for diseaseID in listGroup))
+                # walk the diseases once, fixing their order so the returned group IDs can be zipped back onto it
+                listGroup = list()
+                listName = list()
+                listGroupData = list()
+                for diseaseID,(diseaseName,classNID) in diseases.items():
+                        listGroup.append(diseaseID)
+                        listName.append(diseaseName)
+                        listGroupData.append( (subtypeID['-'] if classNID is None else listSubtype[diseaseClass[classNID]], diseaseName, None) )
+                listAID = self.addTypedGroups(typeID['disease'], listGroupData)
                 groupAID = dict(zip(listGroup,listAID))
+                listGroupData = None
                 self.log(" OK\n")
 
                 # store diseases names
                 self.log("writing diseases names to the database ...")
-                self.addGroupNamespacedNames(namespaceID['disgenet_id'], ((groupAID[diseaseID],diseaseID) for diseaseID in listGroup))
-                self.addGroupNamespacedNames(namespaceID['disease'], ((groupAID[diseaseID],diseases[diseaseID][0]) for diseaseID in listGroup))
+                self.addGroupNamespacedNames(namespaceID['disgenet_id'], zip(listAID,listGroup))
+                self.addGroupNamespacedNames(namespaceID['disease'], zip(listAID,listName))
+                listName = None
                 diseases = None
                 diseaseClass  = None
                 self.log(" OK\n")
 
                 # process disgenet disease identifiers
                 self.log("processing diseases identifiers ...")                
-                diseaseGene = set()
+                # every row gets its own member number, so the rows are already distinct and need no set
+                diseaseGene = list()
                 comm = 'SELECT b.geneId,c.diseaseId FROM geneDiseaseNetwork a LEFT JOIN geneAttributes b ON a.geneNID=b.geneNID LEFT JOIN diseaseAttributes c ON a.diseaseNID=c.diseaseNID ORDER BY c.diseaseId'
-                cur.execute(comm)
-                diseaseGeneResult = cur.fetchall()
-                con.close()
                 numAssoc = 0
-                for pair in diseaseGeneResult:
-                        if pair[1] in listGroup:
+                # iterate the cursor directly rather than holding every association row in memory at once
+                for geneID,diseaseID in cur.execute(comm):
+                        groupID = groupAID.get(diseaseID)
+                        if groupID != None:
                                 numAssoc += 1
-                                diseaseGene.add( (groupAID[pair[1]],numAssoc,pair[0]) )
+                                diseaseGene.append( (groupID,numAssoc,geneID) )
+                con.close()
                 self.log(" OK: %d diseases and gene pairs\n" % (len(diseaseGene),))
 
                 # store gaad disease identifiers
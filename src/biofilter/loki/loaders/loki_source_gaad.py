@@ -56,7 +56,7 @@ class Source_gaad(loki_source.Source):
                 for line in diseaseFile:
                         if not line.startswith("AID"):
                                 continue
-                        words = line.split("\t")
+                        words = line.split("\t", 2)
                         diseaseID = words[0]
                         name = words[1].rstrip()
                         # store disease name of each disease ID (AID)
@@ -86,7 +86,7 @@ class Source_gaad(loki_source.Source):
                 for line in relationshipFile:
                         if line.startswith("disease_uid1"):
                                 continue
-                        words = line.split("\t")
+                        words = line.split("\t", 2)
                         diseaseID = words[0]
                         diseaseID2 = words[1]
                         # store disease pairs that shares genes
@@ -111,7 +111,7 @@ class Source_gaad(loki_source.Source):
                 for line in ncbiFile:
                         if line.startswith("disease_"):
                                 continue
-                        words = line.split("\t")
+                        words = line.split("\t", 2)
                         diseaseID = words[0].strip()
                         entrezID = words[1].strip()
                         num+=1
@@ -120,7 +120,7 @@ class Source_gaad(loki_source.Source):
                 for line in genecardsFile:
                         if line.startswith("disease_"):
                                 continue
-                        words = line.split("\t")
+                        words = line.split("\t", 2)
                         diseaseID = words[0].strip()
                         entrezID = words[1].strip()
                         num+=1
@@ -129,7 +129,7 @@ class Source_gaad(loki_source.Source):
                 for line in pubmedFile:
                         if line.startswith("disease_"):
                                 continue
-                        words = line.split("\t")
+                        words = line.split("\t", 3)
                         diseaseID = words[2].strip()
                         entrezID = words[1].strip()
                         num+=1
@@ -83,9 +83,10 @@ class Source_kegg(loki_source.Source):
 			pathCategory = json.load(pathCategoryFile)
 		#store subtypes into pathSubtype
 		pathSubtype = {}
+		skipCategories = frozenset(('Global and overview maps', 'Carbohydrate metabolism', 'Energy metabolism', 'Immune system', 'Endocrine system'))
 		for category in pathCategory['children']:
 			for category2 in category['children']:
-				if category2['name']=='Global and overview maps' or category2['name']=='Carbohydrate metabolism' or category2['name']=='Energy metabolism' or category2['name']=='Immune system' or category2['name']=='Endocrine system':
+				if category2['name'] in skipCategories:
 					continue
 				for category3 in category2['children']:
 					line = category3['name'].split("  ")
@@ -94,9 +95,9 @@ class Source_kegg(loki_source.Source):
 		pathCategory = None
 		#with pathCategory
 		pathName = {}
-		with open('list-pathway-hsa','rU') as pathFile:
+		with open('list-pathway-hsa','r') as pathFile:
 			for line in pathFile:
-				words = line.split("\t")
+				words = line.split("\t", 2)
 				pathID = words[0]
 				if pathID not in pathSubtype:
 					pathSubtype[pathID] = "-"
@@ -126,16 +127,17 @@ class Source_kegg(loki_source.Source):
 
 		# process associations
 		self.log("processing pathway gene associations ...")
-		entrezAssoc = set()
+		# every row gets its own member number, so the rows are already distinct and need no set
+		entrezAssoc = list()
 		numAssoc = 0
-		with open('link-pathway-hsa','rU') as assocFile:
+		getPathGID = pathGID.get
+		with open('link-pathway-hsa','r') as assocFile:
 			for line in assocFile:
-				words = line.split("\t")
-				hsaGene = words[0]
-				pathID = words[1].strip().replace("path:hsa","hsa")
-				if pathID in pathGID:
+				words = line.split("\t", 2)
+				groupID = getPathGID(words[1].strip().replace("path:hsa","hsa"))
+				if groupID != None:
 					numAssoc += 1
-					entrezAssoc.add( (pathGID[pathID],numAssoc,hsaGene[4:]) )
+					entrezAssoc.append( (groupID,numAssoc,words[0][4:]) )
 				#if pathway and gene are ok
 			#foreach line in assocFile
 		#with assocFile
@@ -173,9 +175,9 @@ class Source_kegg(loki_source.Source):
 		diseaseCategory = None
 		#with diseaseCategory
 		diseaseName = {}
-		with open('list-disease','rU') as pathFile:
+		with open('list-disease','r') as pathFile:
 			for line in pathFile:
-				words = line.split("\t")
+				words = line.split("\t", 2)
 				pathID = words[0]
 				if pathID not in diseaseSubtype:
 					diseaseSubtype[pathID] = "-"
@@ -201,16 +203,16 @@ class Source_kegg(loki_source.Source):
 
 		# process disease & gene associations
 		self.log("processing disease gene associations ...")
-		entrezAssoc = set()
+		entrezAssoc = list()
 		numAssoc = 0
-		with open('link-disease-hsa','rU') as assocFile:
+		getDiseaseGID = diseaseGID.get
+		with open('link-disease-hsa','r') as assocFile:
 			for line in assocFile:
-				words = line.split("\t")
-				hsaGene = words[0]
-				diseaseID = words[1].strip()[3:]
-				if diseaseID in diseaseGID:
+				words = line.split("\t", 2)
+				groupID = getDiseaseGID(words[1].strip()[3:])
+				if groupID != None:
 					numAssoc += 1
-					entrezAssoc.add( (diseaseGID[diseaseID],numAssoc,hsaGene[4:]) )
+					entrezAssoc.append( (groupID,numAssoc,words[0][4:]) )
 			#foreach line in assocFile
 		#with assocFile
 		self.log(" OK: %d associations\n" % (numAssoc,))
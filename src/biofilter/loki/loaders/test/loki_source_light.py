@@ -3,6 +3,55 @@
 from loki import loki_source
 
 
+# static fixture data, keyed by group label; update() resolves the database IDs
+
+_groups = (
+	#(subtype,label,description)
+	('-', 'red',   'normal group'),
+	('-', 'green', 'unknown member'),
+	('-', 'blue',  'redundant member name'),
+	('-', 'gray',  'large parent group'),
+)
+
+_groupNames = (
+	#(group,name)
+	('red',   'red'),
+	('green', 'green'),
+	('blue',  'blue'),
+	('gray',  'gray'),
+	('gray',  'white'),
+)
+
+_groupRels = (
+	#(group,related_group,relationship,contains)
+	('red',   'gray', 'shade_of',     -1),
+	('green', 'gray', 'shade_of',     -1),
+	('green', 'blue', 'greener_than',  0),
+	('blue',  'gray', 'shade_of',     -1),
+)
+
+_groupMembers = (
+	#(group,member,name)
+	('red',   11, 'A'),
+	('red',   12, 'B'),
+	('green', 21, 'Z'),
+	('green', 22, 'A'),
+	('green', 23, 'B'),
+	('blue',  31, 'A'),
+	('blue',  31, 'A2'),
+	('blue',  32, 'C'),
+	('gray',  41, 'A2'),
+	('gray',  42, 'B'),
+	('gray',  43, 'C'),
+	('gray',  44, 'D'),
+	('gray',  45, 'E'),
+	('gray',  46, 'F'),
+	('gray',  47, 'G'),
+)
+
+_numMembers = len(set(m[1] for m in _groupMembers))
+
+
 class Source_light(loki_source.Source):
 	
 	
@@ -42,64 +91,29 @@ class Source_light(loki_source.Source):
 		
 		# define groups
 		self.log("adding groups to the database ...")
-		listGroup = [
-			#(label,description)
-			(subtypeID['-'], 'red',   'normal group'),
-			(subtypeID['-'], 'green', 'unknown member'),
-			(subtypeID['-'], 'blue',  'redundant member name'),
-			(subtypeID['-'], 'gray',  'large parent group'),
-		]
+		listLabel = [ label for subtype,label,description in _groups ]
+		listGroup = [ (subtypeID[subtype],label,description) for subtype,label,description in _groups ]
 		listGID = self.addTypedGroups(typeID['group'], listGroup)
-		groupGID = dict(zip((g[1] for g in listGroup), listGID))
+		groupGID = dict(zip(listLabel, listGID))
 		self.log(" OK: %d groups\n" % len(groupGID))
 		
 		# define group names
 		self.log("adding group names to the database ...")
-		listName = [
-			#(group_id,name)
-			(groupGID['red'],   'red'),
-			(groupGID['green'], 'green'),
-			(groupGID['blue'],  'blue'),
-			(groupGID['gray'],  'gray'),
-			(groupGID['gray'],  'white'),
-		]
+		listName = [ (groupGID[group],name) for group,name in _groupNames ]
 		self.addGroupNamespacedNames(namespaceID['group'], listName)
 		self.log(" OK: %d names\n" % len(listName))
 		
 		# define group relationships
 		self.log("adding group relationships to the database ...")
-		listRel = [
-			#(group_id,related_group_id,relationship_id,contains)
-			(groupGID['red'],   groupGID['gray'], relationshipID['shade_of'],     -1),
-			(groupGID['green'], groupGID['gray'], relationshipID['shade_of'],     -1),
-			(groupGID['green'], groupGID['blue'], relationshipID['greener_than'],  0),
-			(groupGID['blue'],  groupGID['gray'], relationshipID['shade_of'],     -1),
-		]
+		listRel = [ (groupGID[group],groupGID[related],relationshipID[rel],contains) for group,related,rel,contains in _groupRels ]
 		self.addGroupRelationships(listRel)
 		self.log(" OK: %d relationships\n" % len(listRel))
 		
 		# define group members
 		self.log("adding group members to the database ...")
-		listMember = [
-			#(group_id,member,name)
-			(groupGID['red'],   11, 'A'),
-			(groupGID['red'],   12, 'B'),
-			(groupGID['green'], 21, 'Z'),
-			(groupGID['green'], 22, 'A'),
-			(groupGID['green'], 23, 'B'),
-			(groupGID['blue'],  31, 'A'),
-			(groupGID['blue'],  31, 'A2'),
-			(groupGID['blue'],  32, 'C'),
-			(groupGID['gray'],  41, 'A2'),
-			(groupGID['gray'],  42, 'B'),
-			(groupGID['gray'],  43, 'C'),
-			(groupGID['gray'],  44, 'D'),
-			(groupGID['gray'],  45, 'E'),
-			(groupGID['gray'],  46, 'F'),
-			(groupGID['gray'],  47, 'G'),
-		]
+		listMember = [ (groupGID[group],member,name) for group,member,name in _groupMembers ]
 		self.addGroupMemberTypedNamespacedNames(typeID['gene'], namespaceID['gene'], listMember)
-		self.log(" OK: %d members (%d identifiers)\n" % (len(set(m[1] for m in listMember)),len(listMember)))
+		self.log(" OK: %d members (%d identifiers)\n" % (_numMembers,len(listMember)))
 	#update()
 	
 	
@@ -651,7 +651,7 @@ class Database(object):
 		self._logFile = sys.stderr
 		self._logIndent = 0
 		self._logHanging = False
-		self._db = apsw.Connection('')
+		self._db = apsw.Connection('', statementcachesize=1024) # biofilter re-executes the same generated SQL many times per run
 		self._dbFile = None
 		self._dbNew = None
 		self._updater = None
@@ -925,7 +925,7 @@ class Database(object):
 		try:
 			cursor.execute("DETACH DATABASE `%s`" % db)
 		except apsw.SQLError as e:
-			if not str(e).startswith('SQLError: no such database: '):
+			if 'no such database: ' not in str(e):
 				raise e
 		
 		# attach a new temp db
@@ -953,7 +953,7 @@ class Database(object):
 		try:
 			cursor.execute("DETACH DATABASE `db`")
 		except apsw.SQLError as e:
-			if not str(e).startswith('SQLError: no such database: '):
+			if 'no such database: ' not in str(e):
 				raise e
 		if self._dbFile and not quiet:
 			self.log(" OK\n")
@@ -1827,6 +1827,39 @@ class Database(object):
 	#getSourceIDFiles()
 	
 	
+	def getSourceIDFingerprints(self, sourceIDs=None):
+		"""
+		Retrieves the version, options and files of several data sources at once,
+		with one query per table rather than three per source.
+
+		Args:
+			sourceIDs (list, optional): A list of data source identifiers. Defaults to None, which retrieves information for all sources.
+
+		Returns:
+			dict: A dictionary mapping data source identifiers to tuples of (version, options, files), as returned by getSourceIDVersion(), getSourceIDOptions() and getSourceIDFiles().
+		"""
+		if sourceIDs == None:
+			where,args = "",()
+		else:
+			args = tuple(set(sourceIDs))
+			if not args:
+				return dict()
+			where = " WHERE source_id IN (%s)" % (",".join("?" for sourceID in args),)
+		ret = { sourceID:(None,dict(),dict()) for sourceID in args }
+		with self._db:
+			cursor = self._db.cursor()
+			for row in cursor.execute("SELECT source_id, version FROM `db`.`source`" + where, args):
+				ret[row[0]] = (row[1],dict(),dict())
+			for row in cursor.execute("SELECT source_id, option, value FROM `db`.`source_option`" + where, args):
+				if row[0] in ret:
+					ret[row[0]][1][row[1]] = row[2]
+			for row in cursor.execute("SELECT source_id, filename, COALESCE(modified,''), COALESCE(size,''), COALESCE(md5,'') FROM `db`.`source_file`" + where, args):
+				if row[0] in ret:
+					ret[row[0]][2][row[1]] = tuple(row[2:])
+		return ret
+	#getSourceIDFingerprints()
+	
+	
 	def getTypeID(self, type):
 		"""
 		Retrieves the identifier for a given type.
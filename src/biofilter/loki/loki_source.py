@@ -283,6 +283,11 @@ class Source(object):
 	
 	def deleteAll(self):
 		dbc = self._db.cursor()
+		# the updater only stamps a source once an update has finished, and a failed
+		# update is rolled back, so a source without a stamp has no rows to scan for
+		sql = "SELECT 1 FROM `db`.`source` WHERE source_id = ? AND updated IS NOT NULL"
+		if not any(dbc.execute(sql, (self.getSourceID(),))):
+			return
 		tables = [
 			'snp_merge', 'snp_locus', 'snp_entrez_role',
 			'biopolymer', 'biopolymer_name', 'biopolymer_name_name', 'biopolymer_region',
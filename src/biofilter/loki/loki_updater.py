@@ -215,12 +215,16 @@ class Updater(object):
 					filehash = dict()
 					for filename in os.listdir('.'):
 						stat = os.stat(filename)
-						md5 = hashlib.md5()
 						with open(filename,'rb') as f:
-							chunk = f.read(8*1024*1024)
-							while chunk:
-								md5.update(chunk)
+							if hasattr(hashlib, 'file_digest'):
+								# Python 3.11+ hashes straight from the file's buffer without allocating a new chunk per read
+								md5 = hashlib.file_digest(f, 'md5')
+							else:
+								md5 = hashlib.md5()
 								chunk = f.read(8*1024*1024)
+								while chunk:
+									md5.update(chunk)
+									chunk = f.read(8*1024*1024)
 						filehash[filename] = (filename, int(stat.st_size), int(stat.st_mtime), md5.hexdigest())
 					self.log(" OK\n")
 					
@@ -38,12 +38,24 @@ class liftOver(object):
 	_initChains():
 		Initializes the cached chain data from the database.
 
+	_indexChains():
+		Builds a per-chromosome interval index over the cached chains.
+
 	_findChains(chrom, start, end):
 		Finds chain segments that overlap with the given region.
 
+	_findChainRanges(chrom, start, end):
+		Finds the overlapping segment range of each cached chain.
+
+	_liftRegionCached(chrom, start, end):
+		Maps a region directly against the cached chain segments.
+
 	liftRegion(chrom, start, end):
 		Lifts a genomic region from old_ucschg to new_ucschg assembly.
 
+	liftRegions(chrom, starts, ends):
+		Lifts many genomic regions on one chromosome in a single call.
+
 	_mapRegion(region, first_seg, end_seg, total_mapped_sz):
 		Maps a region using chain segment data.
 
@@ -90,28 +102,57 @@ class liftOver(object):
 			"chain.old_end, chain.new_start, is_fwd, new_chr, " + 
 			"chain_data.old_start, chain_data.old_end, chain_data.new_start " + 
 			"FROM db.chain INNER JOIN db.chain_data USING (chain_id) " +
-			"WHERE old_ucschg=? AND new_ucschg=?" + 
-			"ORDER BY old_chr, score DESC, chain_data.old_start",
+			"WHERE old_ucschg=? AND new_ucschg=? " + 
+			"ORDER BY old_chr, score DESC, chain.old_start DESC, chain.old_end DESC, chain.new_start DESC, is_fwd DESC, new_chr DESC, chain_id DESC, chain_data.old_start",
 			(self._old_ucschg,self._new_ucschg)):
 				
 			chain = (row[2], row[3], row[4], row[5], row[6], row[7], row[0])
 			chr = row[1]
 					
 			if chr not in self._cached_data:
-				self._cached_data[chr] = {chain: []}
+				self._cached_data[chr] = {chain: ([],[],[],[0])}
 				self._cached_keys[chr] = [chain]
 			elif chain not in self._cached_data[chr]:
-				self._cached_data[chr][chain] = []
+				self._cached_data[chr][chain] = ([],[],[],[0])
 				self._cached_keys[chr].append(chain)
 			
-			self._cached_data[chr][chain].append((row[8],row[9],row[10]))
+			# each chain keeps its segments as parallel (old_start, old_end, new_start) lists,
+			# so lookups can bisect the plain old_start list instead of a list of tuples;
+			# the fourth list holds running segment lengths, so any range's total is one subtraction
+			data = self._cached_data[chr][chain]
+			data[0].append(row[8])
+			data[1].append(row[9])
+			data[2].append(row[10])
+			data[3].append(data[3][-1] + row[9] - row[8])
+		
+		# the ORDER BY sorts each chromosome's chains by their whole key tuple, descending,
+		# so _cached_keys is already in score order as the chains are first seen
 		
-		# Sort the chains by score
-		for k in self._cached_keys:
-			self._cached_keys[k].sort(reverse=True)
+		self._indexChains()
+	
+	
+	def _indexChains(self):
+		"""
+		Builds a per-chromosome interval index over the cached chains.
 
-			
-				
+		For each chromosome this stores the chain old_start values in sorted
+		order alongside each chain's score rank, the chain old_end values in
+		sorted order, and the longest chain span. Together these let
+		_findChainRanges count the chains overlapping a region with two binary
+		searches (BITS) and enumerate them from a bounded window instead of
+		testing every chain on the chromosome.
+		"""
+		self._cached_index = {}
+		for chr,keys in self._cached_keys.items():
+			byStart = sorted((c[1], rank) for rank,c in enumerate(keys))
+			self._cached_index[chr] = (
+				[start for start,rank in byStart],
+				[rank for start,rank in byStart],
+				sorted(c[2] for c in keys),
+				max(c[2] - c[1] for c in keys)
+			)
+	
+	
 	def _findChains(self, chrom, start, end):
 		"""
 		Finds chain segments that overlap with the given region.
@@ -145,22 +186,103 @@ class liftOver(object):
 			(self._old_ucschg, self._new_ucschg, chrom, start, end, start, end)):
 				yield row
 		else:
-			for c in self._cached_keys.get(chrom, []):
-				# if the region overlaps the chain...
-				if start <= c[2] and end >= c[1]:
-					data = self._cached_data[chrom][c]
-					idx = bisect.bisect(data, (start, sys.maxint, sys.maxint))
-					if idx:
-						idx = idx-1
-
-					if idx < len(data) - 1 and start == data[idx + 1]:
-						idx = idx + 1
-					
-					while idx < len(data) and data[idx][0] < end:
-						yield (c[-1], data[idx][0], data[idx][1], data[idx][2], c[4], c[5])
-						idx = idx + 1
-					
-					
+			for (c, lo, hi) in self._findChainRanges(chrom, start, end):
+				(oldStarts, oldEnds, newStarts, cumLens) = self._cached_data[chrom][c]
+				for idx in range(lo, hi):
+					yield (c[-1], oldStarts[idx], oldEnds[idx], newStarts[idx], c[4], c[5])
+	
+	
+	def _findChainRanges(self, chrom, start, end):
+		"""
+		Finds the range of cached segments of each chain that overlap the given region.
+
+		Parameters:
+		-----------
+		chrom : str
+			Chromosome name or identifier.
+		start : int
+			Start position of the region.
+		end : int
+			End position of the region.
+
+		Yields:
+		------
+		tuple:
+			(chain, lo, hi) where chain is the cached chain key and the
+			overlapping segments are at indices lo through hi-1, in score order.
+		"""
+		if chrom not in self._cached_index:
+			return
+		(chainStarts, chainRanks, chainEnds, maxSpan) = self._cached_index[chrom]
+		
+		# BITS: every chain starting at or before the region's end overlaps it,
+		# except those that also end before the region's start
+		last = bisect.bisect_right(chainStarts, end)
+		count = last - bisect.bisect_left(chainEnds, start)
+		if count <= 0:
+			return
+		
+		# no chain starting before start-maxSpan can reach the region, so collect
+		# the overlapping chains from that window, stopping once all are found
+		keys = self._cached_keys[chrom]
+		first = bisect.bisect_left(chainStarts, start - maxSpan)
+		ranks = []
+		for i in range(last - 1, first - 1, -1):
+			if keys[chainRanks[i]][2] >= start:
+				ranks.append(chainRanks[i])
+				if len(ranks) == count:
+					break
+		ranks.sort()
+		
+		for rank in ranks:
+			c = keys[rank]
+			(oldStarts, oldEnds, newStarts, cumLens) = self._cached_data[chrom][c]
+			# the last segment starting at or before the region may still overlap it
+			lo = max(0, bisect.bisect_right(oldStarts, start) - 1)
+			if lo < len(oldEnds) and oldEnds[lo] < start:
+				lo = lo + 1
+			hi = bisect.bisect_left(oldStarts, end, lo)
+			if lo < hi:
+				yield (c, lo, hi)
+	
+	
+	def _liftRegionCached(self, chrom, start, end):
+		"""
+		Maps a normalized region against the cached chain segments.
+
+		Each overlapping chain is tried in score order using only its first and
+		last overlapping segments, without building a tuple for every segment.
+
+		Parameters:
+		-----------
+		chrom : str
+			Chromosome name or identifier.
+		start : int
+			Start position of the region.
+		end : int
+			End position of the region (greater than start).
+
+		Returns:
+		--------
+		tuple or None:
+			Mapped region (new_chr, new_start, new_end) or None if unable to map.
+		"""
+		region = (start, end)
+		mapRegion = self._mapRegion
+		for (c, lo, hi) in self._findChainRanges(chrom, start, end):
+			(oldStarts, oldEnds, newStarts, cumLens) = self._cached_data[chrom][c]
+			total_mapped_sz = cumLens[hi] - cumLens[lo]
+			last = hi - 1
+			mapped_reg = mapRegion(region,
+				(c[-1], oldStarts[lo], oldEnds[lo], newStarts[lo], c[4], c[5]),
+				(c[-1], oldStarts[last], oldEnds[last], newStarts[last], c[4], c[5]),
+				total_mapped_sz
+			)
+			if mapped_reg:
+				return mapped_reg
+		return None
+	
+	
 	def liftRegion(self, chrom, start, end):
 		"""
 		Lifts a genomic region from old_ucschg to new_ucschg assembly.
@@ -194,6 +316,12 @@ class liftOver(object):
 			is_region = False
 			end = start + 1	
 		
+		if self._cached:
+			mapped_reg = self._liftRegionCached(chrom, start, end)
+			if mapped_reg and not is_region:
+				mapped_reg = (mapped_reg[0], mapped_reg[1], mapped_reg[1]) #bug?
+			return mapped_reg
+		
 		ch_list = self._findChains(chrom, start, end)
 		
 		# This will be a tuple of (start, end) of the mapped region
@@ -206,35 +334,74 @@ class liftOver(object):
 		total_mapped_sz = 0
 		first_seg = None
 		end_seg = None
+		region = (start, end)
+		mapRegion = self._mapRegion
 		for seg in ch_list:
+			(seg_chain, seg_start, seg_end) = seg[0:3]
 			if curr_chain is None:
-				curr_chain = seg[0]
+				curr_chain = seg_chain
 				first_seg = seg
 				end_seg = seg
-				total_mapped_sz = seg[2] - seg[1]
-			elif seg[0] != curr_chain:
-				mapped_reg = self._mapRegion((start, end), first_seg, end_seg, total_mapped_sz)
+				total_mapped_sz = seg_end - seg_start
+			elif seg_chain != curr_chain:
+				mapped_reg = mapRegion(region, first_seg, end_seg, total_mapped_sz)
 				if not mapped_reg:
+					curr_chain = seg_chain
 					first_seg = seg
 					end_seg = seg
-					total_mapped_sz = seg[2] - seg[1]
+					total_mapped_sz = seg_end - seg_start
 				else:
 					break
 			else:
 				end_seg = seg
-				total_mapped_sz = total_mapped_sz + seg[2] - seg[1]
+				total_mapped_sz = total_mapped_sz + seg_end - seg_start
 				
 		if not mapped_reg and first_seg is not None:
-			mapped_reg = self._mapRegion((start, end), first_seg, end_seg, total_mapped_sz)
+			mapped_reg = mapRegion(region, first_seg, end_seg, total_mapped_sz)
 		
 		if mapped_reg and not is_region:
 			mapped_reg = (mapped_reg[0], mapped_reg[1], mapped_reg[1]) #bug?
 		
 		return mapped_reg
-		
-				
-				
+	
+	
+	def liftRegions(self, chrom, starts, ends):
+		"""
+		Lifts many genomic regions on one chromosome in a single call.
 
+		Parameters:
+		-----------
+		chrom : str
+			Chromosome name or identifier shared by all regions.
+		starts : iterable of int
+			Start positions of the regions.
+		ends : iterable of int
+			End positions of the regions, in the same order as starts.
+
+		Returns:
+		--------
+		list:
+			One result per region, in input order, each as returned by
+			liftRegion: (new_chr, new_start, new_end) or None.
+		"""
+		if not self._cached:
+			liftRegion = self.liftRegion
+			return [liftRegion(chrom, start, end) for start,end in zip(starts, ends)]
+		
+		# with cached chains, skip liftRegion's per-call dispatch and normalize here
+		liftRegionCached = self._liftRegionCached
+		results = []
+		for start,end in zip(starts, ends):
+			if start > end:
+				(start, end) = (end, start)
+			elif start == end:
+				mapped_reg = liftRegionCached(chrom, start, start + 1)
+				results.append(mapped_reg and (mapped_reg[0], mapped_reg[1], mapped_reg[1]))
+				continue
+			results.append(liftRegionCached(chrom, start, end))
+		return results
+	
+	
 	def _mapRegion(self, region, first_seg, end_seg, total_mapped_sz):
 		"""
 		Maps a region using chain segment data.
@@ -327,11 +494,15 @@ if __name__ == "__main__":
 		genomic coordinates, replaces spaces and tabs with colons, adjusts
 		chromosome names, and retrieves chromosome numbers from 'db'.
 		"""
+		chrNum = db.chr_num.get
 		for l in f:
-			wds = l.split()
+			# only the first three columns are parsed; the label keeps the whole line
+			wds = l.split(None, 3)
 			if wds[0].lower().startswith('chr'):
 				wds[0] = wds[0][3:]
-			yield (l.strip().replace(" ",":").replace("\t",":"), db.chr_num.get(wds[0],-1), int(wds[1]), int(wds[2]), None)
+			yield (l.strip().replace(" ",":").replace("\t",":"), chrNum(wds[0],-1), int(wds[1]), int(wds[2]), None)
+	
+	errorBuffer = []
 	
 	def errorCallback(r):
 		"""
@@ -344,10 +515,17 @@ if __name__ == "__main__":
 
 		Notes:
 		------
-		This function prints the error details to the stderr stream 'u'
-		in a tab-separated format.
+		This function queues the error details in a tab-separated format
+		and writes them to the unmapped stream 'u' in batches.
 		"""
-		print >> u, "\t".join(str(c) for c in r)
+		errorBuffer.append("\t".join(str(c) for c in r) + "\n")
+		if len(errorBuffer) >= 8192:
+			u.writelines(errorBuffer)
+			del errorBuffer[:]
 	
-	for r in db.generateLiftOverRegions(old, new, generateInputs(f), errorCallback=errorCallback):
-		print >> m, "chr%s\t%s\t%d\t%d" % (db.chr_name.get(r[1],r[1]), r[0], r[2], r[3])
+	chrName = db.chr_name.get
+	m.writelines(
+		"chr%s\t%s\t%d\t%d\n" % (chrName(r[1],r[1]), r[0], r[2], r[3])
+		for r in db.generateLiftOverRegions(old, new, generateInputs(f), errorCallback=errorCallback)
+	)
+	u.writelines(errorBuffer)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+
+# Shared fixtures for the checks against the simulated test knowledge
+# (loki-build.py --test-data).
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+BIOFILTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'biofilter')
+
+
+def run(script, args, cwd, hashSeed=None, stdout=subprocess.DEVNULL):
+	env = dict(os.environ)
+	if hashSeed != None:
+		env['PYTHONHASHSEED'] = str(hashSeed)
+	return subprocess.run(
+		[sys.executable, os.path.join(BIOFILTER_DIR, script)] + args,
+		cwd=cwd, env=env, check=True, stdout=stdout, stderr=subprocess.DEVNULL
+	).stdout
+
+
+@pytest.fixture(scope='session')
+def testdb(tmp_path_factory):
+	path = tmp_path_factory.mktemp('loki')
+	run('loki-build.py', ['-k', 'test.db', '--test-data', '--update', '--cache-only'], str(path))
+	return path
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+# Regression checks for model generation against the simulated test knowledge
+# (loki-build.py --test-data), using the expected outputs documented in
+# docs/02_Biofilter/04_ModelingExamples.md.
+
+import os
+
+import pytest
+
+from conftest import run
+
+pytest.importorskip('apsw')
+pytest.importorskip('wget')
+
+
+def _models(testdb, label, args, modelType, hashSeed=None):
+	run('biofilter.py', ['-k', 'test.db', '--prefix', label] + args + ['-m', modelType], str(testdb), hashSeed)
+	with open(os.path.join(str(testdb), '%s.%s.models' % (label, modelType))) as modelFile:
+		return [line.rstrip('\n').split('\t') for line in modelFile][1:]
+
+
+def test_gene_models(testdb):
+	assert _models(testdb, 'gene', ['--gene', 'A', 'B', 'C', 'D', 'E'], 'gene') == [['A', 'C', '2-3']]
+
+
+def test_snp_models(testdb):
+	assert _models(testdb, 'snp', ['--source', 'light', 'paint'], 'snp') == [
+		['rs11', 'rs15', '2-3'],
+		['rs11', 'rs16', '2-3'],
+		['rs12', 'rs15', '2-3'],
+		['rs12', 'rs16', '2-3'],
+	]
+
+
+def test_group_models_pair_distinct_genes(testdb):
+	# each side of a model candidate must come from its own group-gene membership;
+	# joining one gene to both sides paired groups through a single shared gene
+	expected = [
+		['red',   'blue', '2-3'],
+		['red',   'gray', '2-3'],
+		['red',   'cyan', '2-3'],
+		['green', 'blue', '2-3'],
+		['green', 'gray', '2-3'],
+		['green', 'cyan', '2-3'],
+		['blue',  'gray', '2-3'],
+		['blue',  'cyan', '2-3'],
+		['gray',  'cyan', '2-3'],
+	]
+	for hashSeed in range(4):
+		assert _models(testdb, 'group%d' % hashSeed, ['--source', 'light', 'paint', 'spectrum'], 'group', hashSeed) == expected
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Regression checks for PARIS output against the simulated test knowledge
+# (loki-build.py --test-data).
+
+import itertools
+import os
+import subprocess
+
+import pytest
+
+from conftest import run
+
+pytest.importorskip('apsw')
+pytest.importorskip('wget')
+
+PARIS_ARGS = [
+	'--snp', 'rs11', 'rs12', 'rs13', 'rs15', 'rs16', 'rs17', 'rs18', 'rs19', 'rs22', 'rs24', 'rs32', 'rs33',
+	'--region', 'chr1:5-25', 'chr1:25-55', 'chr1:55-95', 'chr2:5-45', 'chr3:5-65',
+	'--paris', 'yes', '--paris-details', 'yes', '--random-number-generator-seed', '1',
+]
+
+
+def test_paris_stdout_matches_files(testdb):
+	# with --stdout, each summary line is followed by its own detail lines,
+	# and every line is written exactly once
+	run('biofilter.py', ['-k', 'test.db', '--prefix', 'paris'] + PARIS_ARGS, str(testdb))
+	with open(os.path.join(str(testdb), 'paris.paris-summary')) as summaryFile:
+		summary = summaryFile.read().splitlines()
+	with open(os.path.join(str(testdb), 'paris.paris-detail')) as detailFile:
+		detail = detailFile.read().splitlines()
+	assert len(summary) > 1
+	
+	expected = [summary[0], detail[0]]
+	detailGroups = itertools.groupby(detail[1:], key=lambda line: line.split('\t', 1)[0])
+	for line,(groupID,lines) in zip(summary[1:], detailGroups):
+		assert line.split('\t', 1)[0] == groupID
+		expected.append(line)
+		expected.extend(lines)
+	assert len(expected) == len(summary) + len(detail)
+	
+	stdout = run('biofilter.py', ['-k', 'test.db', '--stdout'] + PARIS_ARGS, str(testdb), stdout=subprocess.PIPE)
+	assert stdout.decode('utf8').splitlines() == expected